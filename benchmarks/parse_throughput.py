@@ -0,0 +1,211 @@
+"""
+Parse throughput of diff-cover/diff-quality reports, in lines/sec.
+
+Compares the legacy whole-content regex scans ("before") against the single
+pass parsers with precompiled anchored patterns ("after") on synthetic reports.
+
+The "stream" case parses coverage straight from an S3-like body (as production
+does), decoded by codecs.getreader ("before") or s3.read_lines ("after").
+
+Usage (from repo root):
+    python -m benchmarks.parse_throughput [--lines 100000] [--repeat 3]
+"""
+import argparse
+import codecs
+import io
+import re
+import time
+
+from botocore.response import StreamingBody
+
+from src import quality_summary
+from src.aws import s3
+from src.qualitytools.factory import create_quality_adapter
+
+QUALITY_HEADER = """-------------
+Diff Quality
+Quality Report: {tool}
+Diff: origin/dev...HEAD, staged and unstaged changes
+-------------
+"""
+QUALITY_FOOTER = """-------------
+Total:   {total} lines
+Violations: {violations} lines
+% Quality: 99%
+-------------
+"""
+COVERAGE_HEADER = """-------------
+Diff Coverage
+Diff: origin/dev...HEAD, staged and unstaged changes
+-------------
+"""
+COVERAGE_FOOTER = """-------------
+Total:   {total} lines
+Missing: {missing} lines
+Coverage: 15%
+-------------
+"""
+ISSUE_LINES = {
+    "flake8": "{path}:{n}: F401 'module.Name' imported but unused (see docs)",
+    "eslint": "{path}:{n}: Error - Missing semicolon. (semi)",
+}
+
+
+def _create_quality_report(tool, lines):
+    body = []
+    for n in range(lines // 4):
+        path = f"package/module_{n}/very/long/path/to/some/file_{n}.py"
+        body.append(f"{path} (75.0%):")
+        body.extend(ISSUE_LINES[tool].format(path=path, n=i) for i in range(3))
+
+    return (
+        QUALITY_HEADER.format(tool=tool)
+        + "\n".join(body)
+        + "\n"
+        + QUALITY_FOOTER.format(total=len(body), violations=len(body))
+    )
+
+
+def _create_coverage_report(lines):
+    body = [
+        f"package/module_{n}/file_{n}.py (60.0%): Missing lines 24-25,30,41-60"
+        for n in range(lines)
+    ]
+    return (
+        COVERAGE_HEADER
+        + "\n".join(body)
+        + "\n"
+        + COVERAGE_FOOTER.format(total=len(body), missing=len(body))
+    )
+
+
+# Legacy implementations, as they were before the single pass parsers
+def _legacy_base(content):
+    return {
+        "target_branch": re.search(r"Diff: (.*)\.\.\.", content).group(1),
+        "total": re.search(r"Total: (.*) line", content).group(1).strip(),
+        "violations": re.search(r"Violations: (.*) line", content).group(1).strip(),
+        "quality": re.search(r"Quality: (.*)", content).group(1).strip(),
+    }
+
+
+def _legacy_adapter(content, issue_pattern, file_pattern):
+    report = _legacy_base(content)
+
+    matches = re.findall(issue_pattern, content)
+    report["issues"] = [
+        {
+            "file": match[0],
+            "line": match[1],
+            "error_code": match[2],
+            "description": match[3],
+        }
+        for match in matches
+    ]
+
+    matches = re.findall(file_pattern, content)
+    report["files"] = [{"file": match[0], "value": match[1]} for match in matches]
+    return report
+
+
+def _legacy_flake8(content):
+    return _legacy_adapter(content, r"(.*):(\d+): ([A-Z]\d+) (.*)", r"(.*) \((.*)\)")
+
+
+def _legacy_eslint(content):
+    return _legacy_adapter(content, r"(.*):(\d+): (.*) - (.*)", r"(.*) \((\d.*)\)")
+
+
+def _legacy_coverage(content):
+    return {
+        "target_branch": re.search(r"Diff: (.*)\.\.\.", content).group(1),
+        "total": re.search(r"Total: (.*) line", content).group(1).strip(),
+        "missing": re.search(r"Missing: (.*) line", content).group(1).strip(),
+        "coverage": re.search(r"Coverage: (.*)", content).group(1).strip(),
+        "files": [
+            {"file": match[0], "value": match[1], "missing": match[2] or False}
+            for match in re.findall(r"(.*) \((.*)\)(.*)", content)
+        ],
+    }
+
+
+def _create_body(data):
+    return StreamingBody(io.BytesIO(data), len(data))
+
+
+def _legacy_stream_coverage(data):
+    lines = codecs.getreader("utf-8")(_create_body(data))
+    return quality_summary._parse_coverage_content(lines)
+
+
+def _stream_coverage(data):
+    return quality_summary._parse_coverage_content(s3.read_lines(_create_body(data)))
+
+
+def _parse_quality(content):
+    adapter, _ = create_quality_adapter(content)
+    return adapter.generate_report()
+
+
+def _measure(func, content, repeat):
+    """
+    Returns the best lines/sec out of repeat runs
+    """
+    lines = content.count("\n" if isinstance(content, str) else b"\n")
+    best = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(content)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return lines / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cases = [
+        (
+            "flake8",
+            _create_quality_report("flake8", args.lines),
+            _legacy_flake8,
+            _parse_quality,
+        ),
+        (
+            "eslint",
+            _create_quality_report("eslint", args.lines),
+            _legacy_eslint,
+            _parse_quality,
+        ),
+        (
+            "coverage",
+            _create_coverage_report(args.lines),
+            _legacy_coverage,
+            quality_summary._parse_coverage_content,
+        ),
+        (
+            "stream",
+            _create_coverage_report(args.lines).encode("utf-8"),
+            _legacy_stream_coverage,
+            _stream_coverage,
+        ),
+    ]
+
+    print(
+        f"{'report':<10}{'before (lines/s)':>20}{'after (lines/s)':>20}"
+        f"{'speedup':>10}"
+    )
+    for name, content, before, after in cases:
+        before_rate = _measure(before, content, args.repeat)
+        after_rate = _measure(after, content, args.repeat)
+        speedup = after_rate / before_rate
+        print(f"{name:<10}{before_rate:>20,.0f}{after_rate:>20,.0f}{speedup:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Import time of every Lambda handler module, as measured by python -X importtime.
+
+Each module is imported in a fresh interpreter from src/ (like Lambda does),
+the best cumulative time out of repeat runs is reported along with its
+heaviest direct imports and whether boto3/requests got loaded.
+
+Usage (from repo root):
+    python -m benchmarks.startup_importtime [--repeat 5] [--top 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+HANDLER_MODULES = ["pr_standard", "quality_summary", "codefreezer"]
+HEAVY_MODULES = ["boto3", "requests"]
+
+
+def _import_times(module):
+    """
+    Returns a list of (name, depth, cumulative microseconds) for every import
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+
+    times = []
+    for line in result.stderr.splitlines():
+        # e.g. "import time:       615 |      97828 |     requests"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        times.append((name.strip(), depth, int(cumulative)))
+
+    return times
+
+
+def _measure(module, repeat):
+    """
+    Returns the run where module took less to import
+    """
+    runs = [_import_times(module) for _ in range(repeat)]
+    return min(runs, key=lambda times: _get_total(module, times))
+
+
+def _get_total(module, times):
+    return next(cumulative for name, _, cumulative in times if name == module)
+
+
+def _get_direct_imports(module, times):
+    """
+    Children are listed right before their parent and one level deeper,
+    anything before the previous top level import (e.g. site) isn't module's.
+    """
+    index = next(
+        i for i, (name, depth, _) in enumerate(times) if name == module and depth == 0
+    )
+    direct = []
+
+    for name, depth, cumulative in reversed(times[:index]):
+        if depth == 0:
+            break
+        if depth == 1:
+            direct.append((name, cumulative))
+
+    return direct
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    for module in HANDLER_MODULES:
+        times = _measure(module, args.repeat)
+        total = _get_total(module, times)
+        loaded = {name for name, _, _ in times}
+        heavy = [name for name in HEAVY_MODULES if name in loaded] or ["none"]
+
+        print(f"{module}: {total / 1000:.1f}ms (heavy SDKs loaded: {', '.join(heavy)})")
+
+        direct = _get_direct_imports(module, times)
+        for name, cumulative in sorted(direct, key=lambda item: -item[1])[:args.top]:
+            print(f"    {name:<40}{cumulative / 1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -47,6 +47,13 @@ class CircleCommitDTO:
             pr_link=pr_link
         )
 
+    @property
+    def quality_tools(self):
+        """
+        Commits checked by many tools have them comma separated in quality_tool
+        """
+        return self.quality_tool.split(",") if self.quality_tool else []
+
     def get_reports_links(self):
         """
         Returns artifacts links from CircleCI
@@ -66,6 +73,15 @@ class CircleCommitDTO:
             },
         }
 
+        artifacts_url = (
+            f"https://{self.build_num}-{self.repo_id}-gh.circle-artifacts.com"
+        )
+        for tool in self.quality_tools:
+            reports.setdefault(tool, {
+                "name": f"{tool}.html",
+                "url": f"{artifacts_url}/0/quality-reports/{tool}.html",
+            })
+
         return reports
 
     def _extract_pr_data(self):
@@ -0,0 +1,27 @@
+import json
+import logging
+
+try:
+    from aws import clients
+    import instrumentation
+except ModuleNotFoundError:  # For tests
+    from . import clients
+    from .. import instrumentation
+
+logger = logging.getLogger()
+
+
+@instrumentation.timed("lambda")
+def invoke_async(function_name, payload):
+    """
+    Fires an asynchronous ("Event") invocation, Lambda queues it and
+    answers right away without waiting for the function to run.
+    """
+    client = clients.get_client("lambda")
+
+    print(f"Invoking {function_name} asynchronously")
+    client.invoke(
+        FunctionName=function_name,
+        InvocationType="Event",
+        Payload=json.dumps(payload).encode(),
+    )
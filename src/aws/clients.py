@@ -0,0 +1,74 @@
+import os
+import threading
+
+MAX_POOL_CONNECTIONS = int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", 10))
+CONNECT_TIMEOUT = float(os.environ.get("AWS_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.environ.get("AWS_READ_TIMEOUT", 10))
+MAX_ATTEMPTS = int(os.environ.get("AWS_MAX_ATTEMPTS", 3))
+# "legacy", "standard" or "adaptive", requires botocore >= 1.15 when set
+RETRY_MODE = os.environ.get("AWS_RETRY_MODE", "")
+
+# Live as long as the container, so warm invocations reuse them (and their connections)
+_clients = {}
+_resources = {}
+# boto3 default session isn't thread safe when creating clients
+_lock = threading.Lock()
+
+
+def _get_config():
+    from botocore.config import Config
+
+    retries = {"max_attempts": MAX_ATTEMPTS}
+    if RETRY_MODE:
+        retries["mode"] = RETRY_MODE
+
+    return Config(
+        max_pool_connections=MAX_POOL_CONNECTIONS,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        retries=retries,
+    )
+
+
+def get_client(service):
+    """
+    Returns the container scoped boto3 client for service, created on first use.
+    boto3 is only imported then too, handlers that never touch AWS don't pay for it.
+    """
+    import boto3
+
+    with _lock:
+        if service not in _clients:
+            _clients[service] = boto3.client(service, config=_get_config())
+
+        return _clients[service]
+
+
+def get_resource(service):
+    """
+    Returns the container scoped boto3 resource for service, created on first use
+    """
+    import boto3
+
+    with _lock:
+        if service not in _resources:
+            _resources[service] = boto3.resource(service, config=_get_config())
+
+        return _resources[service]
+
+
+def register(service, client=None, resource=None):
+    """
+    Replaces the client and/or resource used for service (e.g. by a local stand-in)
+    """
+    with _lock:
+        if client is not None:
+            _clients[service] = client
+        if resource is not None:
+            _resources[service] = resource
+
+
+def reset():
+    with _lock:
+        _clients.clear()
+        _resources.clear()
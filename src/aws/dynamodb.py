@@ -1,6 +1,13 @@
 import logging
+import os
+import time
 
-import boto3
+try:
+    from aws import clients, report_codec, s3
+    import instrumentation
+except ModuleNotFoundError:  # For tests
+    from . import clients, report_codec, s3
+    from .. import instrumentation
 
 logger = logging.getLogger()
 
@@ -15,20 +22,34 @@ DEFAULT_CODEFREEZE_STATUS = {
 
 # Quality
 QUALITY_TABLE = "QualityReports"
+# Enough to publish PR checks, without the (heavy) reports
+STATUS_FIELDS = (
+    "commit_sha", "owner", "project", "build_num", "quality_tool", "coverage", "quality"
+)
+# Reports are either inline or in S3, reading one of them requires both
+REPORTS_FIELDS = ("reports", "reports_key")
+
+# Encoded reports bigger than it go to S3 (DynamoDB items are limited to 400KB)
+MAX_INLINE_REPORTS_SIZE = int(os.environ.get("MAX_INLINE_REPORTS_SIZE", 350 * 1024))
+
+# Cache (optional), shared by every function
+CACHE_TABLE = os.environ.get("CACHE_TABLE", "")
 
 
 def _get_table(name):
-    dynamodb = boto3.resource("dynamodb")
+    dynamodb = clients.get_resource("dynamodb")
     table = dynamodb.Table(name)
     return table
 
 
 # CodeFreeze
+@instrumentation.timed("dynamodb")
 def write_config(key, **kwargs):
     table = _get_table(CODE_FREEZE_TABLE)
     table.put_item(Item={"ConfigName": key, **kwargs})
 
 
+@instrumentation.timed("dynamodb")
 def get_code_freeze_config():
     table = _get_table(CODE_FREEZE_TABLE)
     response = table.get_item(Key={"ConfigName": FREEZE_CONFIG})
@@ -40,7 +61,14 @@ def get_code_freeze_config():
 
 
 # Quality
+@instrumentation.timed("dynamodb")
 def save_reports(cov_report, quality_report, quality_tool, **kwargs):
+    """
+    Reports are stored compact and compressed (see report_codec) in the
+    "reports" attribute, or in S3 under "reports_key" when too big.
+    Their "coverage" and "quality" values are also kept as plain attributes
+    (False when there's no report) so checks can be read without reports.
+    """
     table = _get_table(QUALITY_TABLE)
 
     # Below line is just to be obvious and show the Key, it's not really required
@@ -48,22 +76,111 @@ def save_reports(cov_report, quality_report, quality_tool, **kwargs):
     kwargs.pop("pr_link", False)
     item = {
         "commit_sha": commit_sha,
-        "cov_report": cov_report,
-        "quality_report": quality_report,
         "quality_tool": quality_tool,
+        "schema_version": report_codec.SCHEMA_VERSION,
+        "coverage": cov_report["coverage"] if cov_report else False,
+        "quality": quality_report["quality"] if quality_report else False,
         **kwargs,
     }
 
-    print(f"Saving data to dynamodb {item}")
+    encoded = report_codec.encode(
+        {"cov_report": cov_report, "quality_report": quality_report}
+    )
+    if len(encoded) > MAX_INLINE_REPORTS_SIZE:
+        print(f"Reports are too big ({len(encoded)} bytes), saving them to S3")
+        s3.save_reports_file(commit_sha, encoded)
+        item["reports_key"] = commit_sha
+    else:
+        item["reports"] = encoded
+
+    print(f"Saving data to dynamodb for {commit_sha} ({len(encoded)} bytes of reports)")
 
     table.put_item(Item=item)
 
 
-def get_report(commit_sha):
+def _decode_reports(item):
+    """
+    Restores cov_report and quality_report into item.
+    Items saved before schema_version existed already have them, and reads
+    projected without reports have nothing to decode.
+    """
+    if "reports_key" in item:
+        encoded = s3.get_reports_file(item.pop("reports_key"))
+    elif "reports" in item:
+        encoded = item.pop("reports")
+        # boto3 wraps binary attributes
+        encoded = getattr(encoded, "value", encoded)
+    else:
+        return item
+
+    return {**item, **report_codec.decode(encoded)}
+
+
+@instrumentation.timed("dynamodb")
+def get_report(commit_sha, fields=None, consistent=False):
+    """
+    Reads the item saved for commit_sha, or False when there's none.
+    fields limits the attributes read (reports are only decoded when they are
+    read), consistent asks for a strongly consistent read.
+    """
     table = _get_table(QUALITY_TABLE)
-    response = table.get_item(Key={"commit_sha": commit_sha})
+    params = {"Key": {"commit_sha": commit_sha}, "ConsistentRead": consistent}
+
+    if fields and set(REPORTS_FIELDS) & set(fields):
+        fields = list(dict.fromkeys([*fields, *REPORTS_FIELDS]))
+
+    if fields:
+        # Placeholders avoid clashes with DynamoDB reserved words
+        names = {f"#f{i}": field for i, field in enumerate(fields)}
+        params["ProjectionExpression"] = ", ".join(names)
+        params["ExpressionAttributeNames"] = names
+
+    response = table.get_item(**params)
+
+    if "Item" not in response:
+        return False
+
+    return _decode_reports(response["Item"])
+
+
+def get_report_status(commit_sha, consistent=False):
+    """
+    Reads just what's needed to publish PR checks (see STATUS_FIELDS).
+    Items saved before "coverage" and "quality" existed don't have them.
+    """
+    return get_report(commit_sha, STATUS_FIELDS, consistent)
+
+
+# Cache
+@instrumentation.timed("dynamodb")
+def get_cached_item(key):
+    table = _get_table(CACHE_TABLE)
+    response = table.get_item(Key={"CacheKey": key})
+    item = response.get("Item")
+
+    if not item:
+        return False
+
+    # DynamoDB TTL may take a while to remove expired items
+    expires_at = item.get("ExpiresAt")
+    if expires_at and expires_at < time.time():
+        return False
+
+    return item
+
+
+@instrumentation.timed("dynamodb")
+def put_cached_item(key, ttl=None, **kwargs):
+    table = _get_table(CACHE_TABLE)
+    item = {"CacheKey": key, **kwargs}
+
+    if ttl:
+        item["ExpiresAt"] = int(time.time() + ttl)
+
+    table.put_item(Item=item)
 
-    if "Item" in response:
-        return response["Item"]
 
-    return False
+@instrumentation.timed("dynamodb")
+def delete_cached_item(key):
+    table = _get_table(CACHE_TABLE)
+    table.delete_item(Key={"CacheKey": key})
@@ -0,0 +1,109 @@
+"""
+Compact storage format for coverage/quality reports.
+
+Reports are mostly lists of dicts repeating the same keys and file paths, so
+list fields ("files", "issues") are stored as columns (one list per key) and
+file paths are interned into a single table referenced by index:
+
+    {"paths": ["a.py"], "files": {"file": [0], "value": ["80.0%"]}, ...}
+
+The result is serialized as JSON and zlib compressed.
+"""
+import json
+import zlib
+
+SCHEMA_VERSION = 1
+LIST_FIELDS = ("files", "issues")
+
+
+def _to_columns(rows, intern):
+    keys = []
+    for row in rows:
+        keys.extend(key for key in row if key not in keys)
+
+    columns = {key: [row.get(key) for row in rows] for key in keys}
+    if "file" in columns:
+        columns["file"] = [intern(path) for path in columns["file"]]
+
+    return {"count": len(rows), "columns": columns}
+
+
+def _from_columns(table, paths):
+    columns = dict(table["columns"])
+    if "file" in columns:
+        columns["file"] = [paths[index] for index in columns["file"]]
+
+    # Keys missing from some rows were stored as None
+    return [
+        {key: values[i] for key, values in columns.items() if values[i] is not None}
+        for i in range(table["count"])
+    ]
+
+
+def _encode_report(report, intern):
+    if not report:
+        return report
+
+    encoded = dict(report)
+    for field in LIST_FIELDS:
+        if field in encoded:
+            encoded[field] = _to_columns(encoded[field], intern)
+
+    return encoded
+
+
+def _decode_report(encoded, paths):
+    if not encoded:
+        return encoded
+
+    report = dict(encoded)
+    for field in LIST_FIELDS:
+        if field in report:
+            report[field] = _from_columns(report[field], paths)
+
+    return report
+
+
+def encode(reports):
+    """
+    Encodes a dict of reports (e.g. {"cov_report": ..., "quality_report": ...})
+    into compressed bytes
+    """
+    paths = []
+    indexes = {}
+
+    def _intern(path):
+        if path not in indexes:
+            indexes[path] = len(paths)
+            paths.append(path)
+
+        return indexes[path]
+
+    payload = {
+        "version": SCHEMA_VERSION,
+        "reports": {
+            name: _encode_report(report, _intern) for name, report in reports.items()
+        },
+        "paths": paths,
+    }
+
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return zlib.compress(raw)
+
+
+def decode(data):
+    """
+    Reverts encode, returning the same dict of reports
+    """
+    payload = json.loads(zlib.decompress(data).decode("utf-8"))
+
+    if payload["version"] != SCHEMA_VERSION:
+        raise ValueError(
+            f"Unsupported reports schema version: {payload['version']}"
+        )
+
+    paths = payload["paths"]
+    return {
+        name: _decode_report(report, paths)
+        for name, report in payload["reports"].items()
+    }
@@ -1,13 +1,47 @@
+import io
+import json
 import os
 
-import boto3
-from botocore.exceptions import ClientError
+try:
+    from aws import clients
+    import instrumentation
+except ModuleNotFoundError:  # For tests
+    from . import clients
+    from .. import instrumentation
 
 BUCKET_NAME = os.environ.get("BUCKET_NAME", "ci-quality-reports")
+# Bytes read at once from bodies that aren't file objects (botocore < 1.29)
+CHUNK_SIZE = 64 * 1024
 
 
-def _get_file(prefix, hash):
-    s3 = boto3.client("s3")
+def read_lines(body):
+    """
+    Lazily decodes body lines. Body is closed once every line is read or
+    when the iterator gets closed (e.g. parser stopped early).
+    """
+    if isinstance(body, io.IOBase):
+        # Buffered decoding, way faster than decoding line by line
+        lines = io.TextIOWrapper(body, encoding="utf-8")
+    else:
+        chunks = body.iter_lines(chunk_size=CHUNK_SIZE)
+        lines = (line.decode("utf-8") for line in chunks)
+
+    try:
+        yield from lines
+    finally:
+        body.close()
+
+
+@instrumentation.timed("s3")
+def _stream_file(prefix, hash):
+    """
+    Returns the file as a lazy iterator of decoded lines, read straight from
+    the S3 body, so it's never fully loaded in memory.
+    Returns False when it doesn't exist.
+    """
+    s3 = clients.get_client("s3")
+    # Already loaded along with the client
+    from botocore.exceptions import ClientError
 
     try:
         response = s3.get_object(Bucket=BUCKET_NAME, Key=f"{prefix}/{hash}")
@@ -17,12 +51,56 @@ def _get_file(prefix, hash):
         else:
             raise
     else:
-        return response["Body"].read().decode("utf-8")
+        instrumentation.add_bytes("s3", response.get("ContentLength"))
+        return read_lines(response["Body"])
+
+
+def stream_coverage_file(hash):
+    return _stream_file("coverage", hash)
+
+
+def stream_quality_file(hash, tool=None):
+    """
+    Commits checked by a single tool have one quality/{hash} file, otherwise
+    every tool has its own quality/{hash}/{tool} file.
+    """
+    if tool:
+        return _stream_file("quality", f"{hash}/{tool}")
+
+    return _stream_file("quality", hash)
 
 
-def get_coverage_file(hash):
-    return _get_file("coverage", hash)
+@instrumentation.timed("s3")
+def save_reports_file(hash, data):
+    """
+    Keeps encoded reports too big to fit in DynamoDB
+    """
+    s3 = clients.get_client("s3")
+    s3.put_object(Bucket=BUCKET_NAME, Key=f"reports/{hash}", Body=data)
 
 
-def get_quality_file(hash):
-    return _get_file("quality", hash)
+@instrumentation.timed("s3")
+def get_reports_file(hash):
+    s3 = clients.get_client("s3")
+    response = s3.get_object(Bucket=BUCKET_NAME, Key=f"reports/{hash}")
+    return response["Body"].read()
+
+
+@instrumentation.timed("s3")
+def get_json_file(key):
+    """
+    Returns the parsed JSON file at key, or False when it doesn't exist
+    """
+    s3 = clients.get_client("s3")
+    # Already loaded along with the client
+    from botocore.exceptions import ClientError
+
+    try:
+        response = s3.get_object(Bucket=BUCKET_NAME, Key=key)
+    except ClientError as ex:
+        if ex.response["Error"]["Code"] == "NoSuchKey":
+            return False
+        else:
+            raise
+    else:
+        return json.loads(response["Body"].read())
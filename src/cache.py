@@ -0,0 +1,134 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    from aws import dynamodb
+except ModuleNotFoundError:  # For tests
+    from .aws import dynamodb
+
+logger = logging.getLogger()
+
+_MISSING = object()
+
+
+class LocalCache:
+    """
+    Process-local LRU cache with an optional TTL (in seconds).
+    It lives as long as the container does, so it's shared by warm invocations.
+    """
+
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value, expires_at = self._items.get(key, (_MISSING, None))
+
+            if value is _MISSING or (expires_at and expires_at < time.monotonic()):
+                self._items.pop(key, None)
+                self.misses += 1
+                return default
+
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+
+        with self._lock:
+            self._items[key] = (value, expires_at)
+            self._items.move_to_end(key)
+
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class TieredCache(LocalCache):
+    """
+    LocalCache backed by the DynamoDB cache table (see dynamodb.CACHE_TABLE),
+    so values are shared among containers and survive cold starts.
+
+    Values must be JSON serializable. The persistent tier is best effort:
+    failures are logged and treated as misses.
+
+    persistent=False keeps it local only, and values bigger than
+    max_persistent_size (JSON encoded, in bytes) are only kept locally.
+    """
+
+    def __init__(
+        self, namespace, maxsize=256, ttl=None,
+        persistent=True, max_persistent_size=None
+    ):
+        super().__init__(maxsize, ttl)
+        self.namespace = namespace
+        self.persistent = persistent
+        self.max_persistent_size = max_persistent_size
+
+    def _persistent_key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def _is_persistent(self):
+        return self.persistent and bool(dynamodb.CACHE_TABLE)
+
+    def get(self, key, default=None):
+        value = super().get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        if not self._is_persistent():
+            return default
+
+        try:
+            item = dynamodb.get_cached_item(self._persistent_key(key))
+        except Exception as ex:
+            logger.error(f"Unable to read {key} from persistent cache: {ex!r}")
+            return default
+
+        if not item:
+            return default
+
+        value = json.loads(item["Value"])
+        super().set(key, value)
+        return value
+
+    def set(self, key, value):
+        super().set(key, value)
+
+        if not self._is_persistent():
+            return
+
+        encoded = json.dumps(value)
+        if self.max_persistent_size and len(encoded) > self.max_persistent_size:
+            print(f"{key} is too big ({len(encoded)} bytes) for the persistent cache")
+            return
+
+        try:
+            dynamodb.put_cached_item(self._persistent_key(key), self.ttl, Value=encoded)
+        except Exception as ex:
+            logger.error(f"Unable to write {key} to persistent cache: {ex!r}")
+
+    def delete(self, key):
+        super().delete(key)
+
+        if self._is_persistent():
+            try:
+                dynamodb.delete_cached_item(self._persistent_key(key))
+            except Exception as ex:
+                logger.error(f"Unable to delete {key} from persistent cache: {ex!r}")
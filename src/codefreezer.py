@@ -1,16 +1,23 @@
 import json
 import logging
 import os
+import time
 from urllib.parse import parse_qs
 
 try:
-    from thirdparties import github
-    from aws import dynamodb
+    from thirdparties import github, slack
+    from aws import awslambda, dynamodb
+    from cache import LocalCache
+    import concurrency
     import error_handler
+    import instrumentation
 except ModuleNotFoundError:  # For tests
-    from .thirdparties import github
-    from .aws import dynamodb
+    from .thirdparties import github, slack
+    from .aws import awslambda, dynamodb
+    from .cache import LocalCache
+    from . import concurrency
     from . import error_handler
+    from . import instrumentation
 
 OK_RESPONSE = {"statusCode": 200, "headers": {"Content-Type": "application/json"}}
 CODE_FREEZE_ENABLED_MESSAGE = (
@@ -19,9 +26,24 @@ CODE_FREEZE_ENABLED_MESSAGE = (
 UNAUTHORIZED_MESSAGE = (
     "Sorry, you're unable to enable/disable codefreeze due authorization"
 )
+DEFERRED_MESSAGE = "Working on it, CodeFreeze will be *{}d* in a moment :hourglass:"
+CODE_FREEZE_CHECK = "CodeFreeze"
+# Max amount of simultaneous GitHub calls when (un)freezing PRs
+FREEZE_MAX_WORKERS = int(os.environ.get("FREEZE_MAX_WORKERS", 10))
+# Async mode: ack Slack right away and (un)freeze in a background invocation
+ASYNC_FREEZE = os.environ.get("ASYNC_FREEZE", "false").lower() == "true"
+DEFERRED_COMMAND_KEY = "deferred_command"
+# Open PRs are listed through a single GraphQL query (per batch of repos)
+# instead of REST
+FREEZE_GRAPHQL = os.environ.get("FREEZE_GRAPHQL", "true").lower() == "true"
+# Seconds the freeze config is reused, other containers see changes after it
+FREEZE_CONFIG_TTL = float(os.environ.get("FREEZE_CONFIG_TTL", 5))
 
 logger = logging.getLogger()
 
+# Freeze config rarely changes while every PR event reads it
+freeze_config_cache = LocalCache(maxsize=1, ttl=FREEZE_CONFIG_TTL)
+
 
 def _extract_command(raw):
     result = {}
@@ -45,8 +67,31 @@ def _has_authorization(username):
     return username in authorized
 
 
+def _get_freeze_config():
+    config = freeze_config_cache.get(dynamodb.FREEZE_CONFIG)
+
+    if config is None:
+        config = dynamodb.get_code_freeze_config()
+        freeze_config_cache.set(dynamodb.FREEZE_CONFIG, config)
+
+    print(
+        f"Freeze config cache: {freeze_config_cache.hits} hits, "
+        f"{freeze_config_cache.misses} misses"
+    )
+    return config
+
+
+def _write_freeze_config(**kwargs):
+    """
+    Writes freeze config, the cached one is dropped so this container
+    doesn't wait for TTL to see it.
+    """
+    dynamodb.write_config(dynamodb.FREEZE_CONFIG, **kwargs)
+    freeze_config_cache.delete(dynamodb.FREEZE_CONFIG)
+
+
 def _status():
-    config = dynamodb.get_code_freeze_config()
+    config = _get_freeze_config()
     author = config["Author"]
 
     def _create_response(status, emoji, author):
@@ -61,6 +106,52 @@ def _status():
         return _create_response("disabled", "fire", author)
 
 
+def _list_open_prs(repos):
+    """
+    Lists open PRs from all repos, through GraphQL when enabled, otherwise
+    (or when it fails) a REST listing per repo, concurrently.
+    Returns a tuple with all PRs found and the repos that failed.
+    """
+    if FREEZE_GRAPHQL:
+        try:
+            return github.get_open_pr_heads(repos)
+        except Exception as ex:
+            logger.error(
+                f"Unable to list open PRs through GraphQL, falling back to REST: {ex!r}"
+            )
+
+    outcomes = concurrency.fan_out(github.get_open_prs, repos, FREEZE_MAX_WORKERS)
+
+    prs = [pr for outcome in outcomes if outcome.ok for pr in outcome.result]
+    failed_repos = [outcome.item for outcome in outcomes if not outcome.ok]
+    return prs, failed_repos
+
+
+def _update_freeze_status(pr, pr_state, description):
+    """
+    Sends CodeFreeze status to PR head commit.
+    Returns None when skipped because GitHub already shows it.
+    """
+    url = pr["statuses_url"]
+    check = {
+        "state": pr_state,
+        "context": CODE_FREEZE_CHECK,
+        "description": description,
+        "target_url": "",
+    }
+
+    if github.SKIP_UNCHANGED_STATUSES:
+        if not github.filter_unchanged_statuses(url, [check]):
+            return None
+
+    response = github.update_pr_status(url, pr_state, CODE_FREEZE_CHECK, description)
+
+    if not response.ok:
+        raise github.GitHubException(url, response.text)
+
+    return response
+
+
 def _freeze(command):
     if not _has_authorization(command["user_name"]):
         return {"response_type": "ephemeral", "text": UNAUTHORIZED_MESSAGE}
@@ -75,30 +166,84 @@ def _freeze(command):
         description = ""
 
     print("Writing status config to: " + status)
-    dynamodb.write_config(
-        dynamodb.FREEZE_CONFIG, Status=status, Author=command["user_name"]
-    )
+    _write_freeze_config(Status=status, Author=command["user_name"])
     # expects to be in format: owner/repo1,owner/repo2
-    repos = os.environ.get("REPOS", []).split(",")
+    repos = [repo for repo in os.environ.get("REPOS", "").split(",") if repo]
 
-    for repo in repos:
-        prs = github.get_open_prs(repo)
+    start = time.perf_counter()
+    prs, failed_repos = _list_open_prs(repos)
 
-        for pr in prs:
-            github.update_pr_status(
-                pr["statuses_url"], pr_state, "CodeFreeze", description
-            )
+    def _update(pr):
+        return _update_freeze_status(pr, pr_state, description)
+
+    outcomes = concurrency.fan_out(_update, prs, FREEZE_MAX_WORKERS)
+    failed = sum(1 for outcome in outcomes if not outcome.ok)
+    unchanged = sum(1 for outcome in outcomes if outcome.ok and outcome.result is None)
+    elapsed = time.perf_counter() - start
+
+    details = f"{len(prs) - failed - unchanged} PRs updated, "
+    if unchanged:
+        details += f"{unchanged} unchanged, "
+    details += f"{failed} failed in {elapsed:.2f}s"
+    if failed_repos:
+        details += "\nUnable to list PRs from: " + ", ".join(failed_repos)
+    print(details)
 
-    return {"text": f"CodeFreeze is *{status}*"}
+    return {"text": f"CodeFreeze is *{status}*", "attachments": [{"text": details}]}
+
+
+def _defer_freeze(command, context):
+    """
+    Hands the freeze over to a background invocation of this same function
+    (or FREEZE_WORKER_FUNCTION when set), which replies to command's response_url.
+    """
+    if not _has_authorization(command["user_name"]):
+        return {"response_type": "ephemeral", "text": UNAUTHORIZED_MESSAGE}
 
+    function_name = os.environ.get("FREEZE_WORKER_FUNCTION") or context.function_name
+    awslambda.invoke_async(function_name, {DEFERRED_COMMAND_KEY: command})
 
+    return {
+        "response_type": "ephemeral",
+        "text": DEFERRED_MESSAGE.format(command["text"]),
+    }
+
+
+def _run_deferred_freeze(command):
+    """
+    Background side of _defer_freeze, result (or failure) is posted to Slack.
+    """
+    try:
+        freeze_response = _freeze(command)
+    except Exception as ex:
+        slack.post_response(
+            command["response_url"],
+            {
+                "response_type": "ephemeral",
+                "text": f"Unable to finish CodeFreeze: {ex!r}",
+            },
+        )
+        raise
+
+    slack.post_response(command["response_url"], freeze_response)
+    return OK_RESPONSE
+
+
+@instrumentation.instrumented("codefreezer.slack_handler")
 @error_handler.wrapper_for("slack")
 def slack_handler(event, context):
+    if DEFERRED_COMMAND_KEY in event:
+        return _run_deferred_freeze(event[DEFERRED_COMMAND_KEY])
+
     slack_command = _extract_command(event.get("body"))
     print("Command text: " + slack_command["text"])
 
     if slack_command["text"] in ["enable", "disable"]:
-        freeze_response = _freeze(slack_command)
+        if ASYNC_FREEZE and slack_command.get("response_url"):
+            freeze_response = _defer_freeze(slack_command, context)
+        else:
+            freeze_response = _freeze(slack_command)
+
         return {**OK_RESPONSE, "body": json.dumps(freeze_response)}
 
     if slack_command["text"] == "status":
@@ -108,12 +253,13 @@ def slack_handler(event, context):
     return {**OK_RESPONSE, "body": "Unknown command"}
 
 
+@instrumentation.instrumented("codefreezer.gh_handler")
 @error_handler.wrapper_for("github")
 def gh_handler(event, context):
     ghevent = json.loads(event.get("body"))
     status_url = ghevent["pull_request"]["statuses_url"]
 
-    config = dynamodb.get_code_freeze_config()
+    config = _get_freeze_config()
     status = config["Status"]
     message = ""
     if status == "enabled":
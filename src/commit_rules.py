@@ -0,0 +1,139 @@
+"""
+Rules (regex patterns) PR titles and commit messages must follow.
+
+Every repo may have its own rules in a JSON file in S3 (see COMMIT_RULES_KEY):
+    {"default": ["^NO-TICKET", ...], "owner/repo": ["^\\w+\\-\\d+", ...]}
+Repos without rules use "default", or the built-in rules when missing.
+"""
+import logging
+import os
+import re
+
+try:
+    from aws import s3
+    from cache import LocalCache
+except ModuleNotFoundError:  # For tests
+    from .aws import s3
+    from .cache import LocalCache
+
+logger = logging.getLogger()
+
+# Key of rules file within BUCKET_NAME, only built-in rules are used when empty
+COMMIT_RULES_KEY = os.environ.get("COMMIT_RULES_KEY", "")
+# Seconds rules file is reused before being read again
+COMMIT_RULES_TTL = int(os.environ.get("COMMIT_RULES_TTL", 300))
+DEFAULT_KEY = "default"
+
+_config_cache = LocalCache(maxsize=1, ttl=COMMIT_RULES_TTL)
+# Compiled rule sets by patterns, they never change
+_rule_sets = LocalCache(maxsize=64)
+# Backreferences would point to other rules' groups and global flags would
+# apply to all rules once combined
+_UNCOMBINABLE = re.compile(r"\\(\d|g<)|\(\?P=|\(\?[aiLmsux]+\)")
+
+
+class RuleSet:
+    """
+    Compiles all patterns into a single alternation, so a message is matched
+    once no matter how many patterns there are.
+    Patterns keep their re.match semantics and the first one matching wins.
+    Invalid patterns are skipped, and patterns that can't be combined (e.g.
+    backreferences or global flags) are matched one by one instead.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = []
+        self._compiled = []
+
+        for pattern in patterns:
+            try:
+                self._compiled.append(re.compile(pattern))
+            except re.error as ex:
+                logger.error(f"Skipping invalid rule {pattern!r}: {ex}")
+                continue
+
+            self.patterns.append(pattern)
+
+        self._matcher = self._combine()
+
+    def _combine(self):
+        if not self.patterns:
+            return None
+
+        if any(_UNCOMBINABLE.search(pattern) for pattern in self.patterns):
+            return None
+
+        alternation = "|".join(
+            f"(?P<rule{index}>{pattern})" for index, pattern in enumerate(self.patterns)
+        )
+        try:
+            return re.compile(alternation)
+        except re.error:
+            # e.g. same group name in two patterns
+            return None
+
+    def match(self, message):
+        """
+        Returns the pattern that matched message, or None
+        """
+        if self._matcher is None:
+            return next(
+                (
+                    pattern
+                    for pattern, compiled in zip(self.patterns, self._compiled)
+                    if compiled.match(message)
+                ),
+                None,
+            )
+
+        match = self._matcher.match(message)
+        if not match:
+            return None
+
+        # Rule groups enclose any group patterns have, so they close last
+        return self.patterns[int(match.lastgroup[len("rule"):])]
+
+
+def compile_rules(patterns):
+    key = tuple(patterns)
+    rules = _rule_sets.get(key)
+
+    if rules is None:
+        rules = RuleSet(patterns)
+        _rule_sets.set(key, rules)
+
+    return rules
+
+
+def _get_config():
+    config = _config_cache.get(COMMIT_RULES_KEY)
+
+    if config is None:
+        try:
+            config = s3.get_json_file(COMMIT_RULES_KEY) or {}
+        except Exception as ex:
+            # Built-in rules are better than failing every PR
+            logger.error(f"Unable to read rules from {COMMIT_RULES_KEY}: {ex!r}")
+            return {}
+
+        _config_cache.set(COMMIT_RULES_KEY, config)
+
+    return config
+
+
+def get_rules(repo, default_patterns):
+    """
+    Returns the RuleSet for repo (as "owner/repo")
+    """
+    if not COMMIT_RULES_KEY:
+        return compile_rules(default_patterns)
+
+    config = _get_config()
+    patterns = config.get(repo) or config.get(DEFAULT_KEY) or default_patterns
+    rules = compile_rules(patterns)
+
+    if not rules.patterns:
+        logger.error(f"No valid rules for {repo}, using built-in rules")
+        return compile_rules(default_patterns)
+
+    return rules
@@ -0,0 +1,44 @@
+import logging
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger()
+
+MAX_WORKERS = int(os.environ.get("MAX_WORKERS", 10))
+
+
+class Outcome(namedtuple("Outcome", ["item", "result", "error"])):
+    """
+    Result of running a single item through fan_out.
+    Either result or error is set, never both.
+    """
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def _run(func, item):
+    try:
+        return Outcome(item, func(item), None)
+    except Exception as ex:
+        logger.error(f"Failed to process {item}: {ex!r}")
+        return Outcome(item, None, ex)
+
+
+def fan_out(func, items, max_workers=MAX_WORKERS):
+    """
+    Calls func for every item using at most max_workers threads.
+
+    Exceptions are captured instead of raised, so one failing item
+    doesn't abort the others.
+    Returns a list of Outcome in the same order as items.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    workers = max(1, min(max_workers, len(items)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda item: _run(func, item), items))
@@ -0,0 +1,148 @@
+"""
+Lightweight per invocation instrumentation.
+
+Spans (GitHub calls, S3 and DynamoDB operations, parsing, rendering...) are
+accumulated by name while a handler runs: how many times, how long and how
+many bytes. Once it finishes, all of them are printed as a single CloudWatch
+Embedded Metric Format line, e.g.:
+
+    {"_aws": {...}, "Handler": "pr_standard.handler", "ColdStart": true,
+     "Duration": 812.3, "github.time": 640.1, "github.count": 3, ...}
+
+Spans may run in parallel threads (see concurrency), so their times may add
+up to more than Duration. Gauges (e.g. GitHub remaining budget) keep the
+last value set.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "LambdaPRChecks")
+
+_lock = threading.Lock()
+_spans = {}
+_gauges = {}
+# First invocation of a container pays for its initialization
+_cold_start = True
+
+
+def record(name, elapsed, size=None):
+    """
+    Adds one occurrence of span name taking elapsed seconds (and size bytes)
+    """
+    with _lock:
+        span = _spans.setdefault(name, {"count": 0, "time": 0.0, "bytes": 0})
+        span["count"] += 1
+        span["time"] += elapsed
+        span["bytes"] += size or 0
+
+
+def add_bytes(name, size):
+    with _lock:
+        span = _spans.setdefault(name, {"count": 0, "time": 0.0, "bytes": 0})
+        span["bytes"] += size or 0
+
+
+def set_gauge(name, value):
+    with _lock:
+        _gauges[name] = value
+
+
+@contextmanager
+def span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """
+    Decorator recording every call of a function as span name
+    """
+    def _outer_wrapper(func):
+        @functools.wraps(func)
+        def _inner_wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return _inner_wrapper
+
+    return _outer_wrapper
+
+
+def _create_metrics_line(handler_name, duration, cold_start, spans, gauges=None):
+    metrics = [
+        {"Name": "Duration", "Unit": "Milliseconds"},
+        {"Name": "ColdStart", "Unit": "Count"},
+    ]
+    values = {"Duration": round(duration * 1000, 3), "ColdStart": int(cold_start)}
+
+    for name, span in sorted(spans.items()):
+        metrics.append({"Name": f"{name}.time", "Unit": "Milliseconds"})
+        metrics.append({"Name": f"{name}.count", "Unit": "Count"})
+        values[f"{name}.time"] = round(span["time"] * 1000, 3)
+        values[f"{name}.count"] = span["count"]
+
+        if span["bytes"]:
+            metrics.append({"Name": f"{name}.bytes", "Unit": "Bytes"})
+            values[f"{name}.bytes"] = span["bytes"]
+
+    for name, value in sorted((gauges or {}).items()):
+        metrics.append({"Name": name, "Unit": "Count"})
+        values[name] = value
+
+    return {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": [["Handler"]],
+                "Metrics": metrics,
+            }],
+        },
+        "Handler": handler_name,
+        **values,
+    }
+
+
+def instrumented(handler_name):
+    """
+    Decorator for Lambda handlers, it prints their spans once they finish
+    (even when they raise).
+    """
+    def _outer_wrapper(func):
+        @functools.wraps(func)
+        def _inner_wrapper(event, *args, **kwargs):
+            global _cold_start
+
+            with _lock:
+                _spans.clear()
+                _gauges.clear()
+            start = time.perf_counter()
+
+            try:
+                return func(event, *args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                cold_start, _cold_start = _cold_start, False
+
+                with _lock:
+                    spans, gauges = dict(_spans), dict(_gauges)
+                    _spans.clear()
+                    _gauges.clear()
+
+                if METRICS_ENABLED:
+                    line = _create_metrics_line(
+                        handler_name, duration, cold_start, spans, gauges
+                    )
+                    print(json.dumps(line))
+
+        return _inner_wrapper
+
+    return _outer_wrapper
@@ -1,20 +1,26 @@
 import os
 import json
 import logging
-import re
 
 try:
     from thirdparties import github
+    from cache import TieredCache
+    import commit_rules
     import error_handler
+    import instrumentation
     import security
 except ModuleNotFoundError:  # For tests
     from .thirdparties import github
+    from .cache import TieredCache
+    from . import commit_rules
     from . import error_handler
+    from . import instrumentation
     from . import security
 
 logger = logging.getLogger()
 
 CHECK_TITLE = "FineTune Standard"
+# Built-in rules, repos may have their own (see commit_rules)
 ALLOWED_COMMITS = [
     r"^\w+\-\d+",
     r"^NO-TICKET",
@@ -23,6 +29,20 @@ ALLOWED_COMMITS = [
     r"Release \d{8}",
 ]
 
+# PR actions that may change title or commits, any other is ignored
+# (e.g. closed, labeled)
+EVALUATED_ACTIONS = {"opened", "reopened", "synchronize", "edited", "ready_for_review"}
+# Edited fields that may change the result, base changes which commits are in PR
+EVALUATED_CHANGES = {"title", "base"}
+
+# How long (seconds) commits validated for a PR are kept,
+# PRs untouched for longer are revalidated
+VALIDATION_CACHE_TTL = int(os.environ.get("VALIDATION_CACHE_TTL", 30 * 24 * 60 * 60))
+# Commits of bigger PRs are only kept in memory (DynamoDB items are limited to 400KB)
+VALIDATION_CACHE_MAX_PERSISTENT_SIZE = int(
+    os.environ.get("VALIDATION_CACHE_MAX_PERSISTENT_SIZE", 64 * 1024)
+)
+
 # reasons
 SUCCESS_REASON = "Your PR is up to standards!"
 TITLE_FAILURE_REASON = "Your PR title is not up to standards"
@@ -35,13 +55,100 @@ OK_RESPONSE = {
 }
 
 
-def _validate_title(title):
-    return any(re.match(allowed, title) for allowed in ALLOWED_COMMITS)
+# Commits validated per PR (see _get_validation_key), along with the head they lead to
+validated_commits = TieredCache(
+    "validated_commits",
+    maxsize=64,
+    ttl=VALIDATION_CACHE_TTL,
+    max_persistent_size=VALIDATION_CACHE_MAX_PERSISTENT_SIZE,
+)
+
+
+def _get_rules(pull_request):
+    repo = pull_request.get("base", {}).get("repo", {}).get("full_name")
+    return commit_rules.get_rules(repo, ALLOWED_COMMITS)
+
+
+def _validate_title(title, rules=None):
+    rules = rules or commit_rules.compile_rules(ALLOWED_COMMITS)
+    return rules.match(title) is not None
 
 
-def _validate_commits(pull_request):
+def _analyze_commits(commits, rules):
     """
-    Retrieves all commits in PR and loop them validating every single message.
+    Validates messages of commits from GitHub (or cached ones, already analyzed)
+    """
+    analyzed = []
+
+    for commit_wrapper in commits:
+        if "commit" in commit_wrapper:
+            message = commit_wrapper["commit"]["message"]
+        else:
+            message = commit_wrapper["message"]
+
+        rule = rules.match(message)
+        analyzed.append({
+            "sha": commit_wrapper["sha"],
+            "message": message,
+            "standard": rule is not None,
+            "rule": rule,
+        })
+
+    return analyzed
+
+
+def _get_validation_key(pull_request):
+    """
+    Returns "owner/repo#number", or None when pull_request isn't complete
+    enough to reuse validations.
+    """
+    try:
+        return f"{pull_request['base']['repo']['full_name']}#{pull_request['number']}"
+    except KeyError:
+        return None
+
+
+def _get_cached_commits(pull_request, before, rules):
+    """
+    Reuses commits fetched before, only commits pushed on top of
+    before (if any) are fetched. Messages are matched again since rules
+    may have changed, that's cheap next to fetching them.
+    Returns None when everything needs to be fetched again.
+    """
+    cached = validated_commits.get(_get_validation_key(pull_request))
+    head = pull_request["head"]["sha"]
+
+    if not cached:
+        return None
+
+    if cached["head"] == head:
+        # e.g. webhook redelivered
+        analyzed = cached["commits"]
+    elif before and cached["head"] == before:
+        compare_url = pull_request["base"]["repo"]["compare_url"]
+        pushed = github.get_compared_commits(compare_url, before, head)
+        if pushed is None:
+            return None
+
+        cached_count = len(cached["commits"])
+        print(f"Fetched {len(pushed)} pushed commit(s), {cached_count} cached")
+        analyzed = cached["commits"] + pushed
+    else:
+        return None
+
+    # Something happened in between (e.g. a rebase), don't trust it
+    if len(analyzed) != pull_request.get("commits", len(analyzed)):
+        return None
+
+    return _analyze_commits(analyzed, rules)
+
+
+def _validate_commits(pull_request, before=None, rules=None, refresh=False):
+    """
+    Validates every commit message in PR. Commits validated for this PR
+    before are reused, so a push (before is the previous head) only costs
+    its own commits. refresh fetches all of them anyway (e.g. base changed,
+    so head is the same but commits in PR aren't).
 
     Returns a tuple (commits, result) in following format
         1: commits:
@@ -50,28 +157,35 @@ def _validate_commits(pull_request):
                     sha: string
                     message: string
                     standard: bool
+                    rule: string (pattern matched, if any)
                 },
             ]
         2: result: Whether ALL commits are up to standard
     """
-    commits = github.get_commits(pull_request["commits_url"])
-    analyzed = []
+    rules = rules or _get_rules(pull_request)
+    key = _get_validation_key(pull_request)
+    reuse = key and not refresh
+    analyzed = _get_cached_commits(pull_request, before, rules) if reuse else None
 
-    for commit_wrapper in commits:
-        commit = {
-            "sha": commit_wrapper["sha"],
-            "message": commit_wrapper["commit"]["message"],
-        }
+    if analyzed is None:
+        commits = github.get_commits(pull_request["commits_url"])
+        analyzed = _analyze_commits(commits, rules)
 
-        commit["standard"] = _validate_title(commit["message"])
-        analyzed.append(commit)
+    if key:
+        validated_commits.set(
+            key, {"head": pull_request["head"]["sha"], "commits": analyzed}
+        )
 
     result = all(commit["standard"] for commit in analyzed)
     return analyzed, result
 
 
-def _validate_pr(pull_request):
+@instrumentation.timed("validate")
+def _validate_pr(pull_request, before=None, refresh=False):
     """
+    before is the previous head when commits were just pushed to PR,
+    refresh ignores commits validated before (see _validate_commits).
+
     Returns a tuple with report, result, reason
         report: A dict in the following format
             title:
@@ -88,8 +202,9 @@ def _validate_pr(pull_request):
         result: Whether it's valid
         reason: Why did it succeed or failed
     """
-    title_valid = _validate_title(pull_request["title"])
-    commits, all_commits_ok = _validate_commits(pull_request)
+    rules = _get_rules(pull_request)
+    title_valid = _validate_title(pull_request["title"], rules)
+    commits, all_commits_ok = _validate_commits(pull_request, before, rules, refresh)
 
     report = {
         "title": {"message": pull_request["title"], "standard": title_valid},
@@ -109,6 +224,27 @@ def _validate_pr(pull_request):
     return report, result, reason
 
 
+def _should_evaluate(ghevent):
+    """
+    Tells whether the event may change the PR result, so others are
+    answered without any GitHub call.
+    Events without action are always evaluated.
+    """
+    action = ghevent.get("action")
+    if action is None:
+        return True
+
+    if action not in EVALUATED_ACTIONS:
+        return False
+
+    if action == "edited":
+        # e.g. only the description was edited
+        return bool(EVALUATED_CHANGES & set(ghevent.get("changes", {})))
+
+    return True
+
+
+@instrumentation.instrumented("pr_standard.handler")
 @error_handler.wrapper_for("github")
 @security.secret_handler("X-Hub-Signature")
 def handler(event, context):
@@ -121,12 +257,31 @@ def handler(event, context):
     status_url = ghevent["pull_request"]["statuses_url"]
     comments_url = ghevent["pull_request"]["comments_url"]
 
-    report, result, reason = _validate_pr(ghevent["pull_request"])
+    if not _should_evaluate(ghevent):
+        print(f"Nothing to evaluate for {ghevent.get('action')} event")
+        return OK_RESPONSE
+
+    # Title edits keep head, so commits cached for it are reused as they are.
+    # Only synchronize (push) events tell the previous head
+    action = ghevent.get("action")
+    before = ghevent.get("before") if action == "synchronize" else None
+    # A new base keeps head too, but changes which commits are in PR
+    refresh = action == "edited" and "base" in ghevent.get("changes", {})
+
+    report, result, reason = _validate_pr(ghevent["pull_request"], before, refresh)
     status = "success" if result else "failure"
 
     print(f"Updating PR status to {status} due {reason}")
     target_url = os.environ.get("DOCS_STANDARD_LINK", "")
-    github.update_pr_status(status_url, status, CHECK_TITLE, reason, target_url)
+    check = {
+        "state": status,
+        "context": CHECK_TITLE,
+        "description": reason,
+        "target_url": target_url,
+    }
+    for outcome in github.publish_statuses(status_url, [check]):
+        if not outcome.ok:
+            raise outcome.error
 
     if result:
         print(f"Everything is perfect: {report}, no standard summary will be written")
@@ -1,27 +1,50 @@
+import functools
 import json
+import os
 import re
+import time
 
 try:
     from thirdparties import github, summary_factory
     from aws import dynamodb, s3
     from qualitytools.factory import create_quality_adapter
+    from qualitytools.base import FILE_NAME
+    from qualitytools.merge import merge_quality_reports
+    from qualitytools.diffcover import BODY, FOOTER, DiffCoverReader, parse_footer_line
     from CircleCommitDTO import CircleCommitDTO
+    from cache import TieredCache
+    import concurrency
     import error_handler
+    import instrumentation
     import security
 except ModuleNotFoundError:  # For tests
     from .thirdparties import github, summary_factory
     from .aws import dynamodb, s3
     from .qualitytools.factory import create_quality_adapter
+    from .qualitytools.base import FILE_NAME
+    from .qualitytools.merge import merge_quality_reports
+    from .qualitytools.diffcover import BODY, FOOTER, DiffCoverReader, parse_footer_line
     from .CircleCommitDTO import CircleCommitDTO
+    from .cache import TieredCache
+    from . import concurrency
     from . import error_handler
+    from . import instrumentation
     from . import security
 
 COV_EMPTY_TEXT = "No lines with coverage information in this diff."
 COV_THRESHOLD = 80
+COV_FOOTER_FIELDS = {"Total": "total", "Missing": "missing", "Coverage": "coverage"}
+# e.g. "path/to/models.py (60.0%): Missing lines 24-25"
+COV_FILE_PATTERN = re.compile(
+    rf"^{FILE_NAME} \((?P<value>\d+(?:\.\d+)?%)\)(?P<missing>.*)$"
+)
 
 QUALITY_EMPTY_TEXT = "No lines with quality information in this diff."
 QUALITY_THRESHOLD = 100
 
+# How long (seconds) we trust a PR summary to still show the last commit written to it
+SUMMARY_CACHE_TTL = int(os.environ.get("SUMMARY_CACHE_TTL", 24 * 60 * 60))
+
 OK_RESPONSE = {
     "statusCode": 200,
     "headers": {"Content-Type": "application/json"},
@@ -29,64 +52,138 @@ OK_RESPONSE = {
 }
 
 
+# Summary url -> commit sha its summary was written for
+summarized_commits = TieredCache("summarized_commit", ttl=SUMMARY_CACHE_TTL)
+
+
 def _get_footers(reference):
     """
     Returns two footers to be appended to summaries
     """
     report_links = reference.get_reports_links()
     cov_link = report_links["coverage"].get("url", "")
-    tool = reference.quality_tool
-    qual_link = report_links[tool].get("url", "")
+    tools = reference.quality_tools
+
+    if len(tools) == 1:
+        qual_link = report_links[tools[0]].get("url", "")
+        quality_footer = summary_factory.create_quality_footer(qual_link)
+    else:
+        quality_footer = "\n".join(
+            summary_factory.create_quality_footer(
+                report_links[tool].get("url", ""), tool
+            )
+            for tool in tools
+        )
 
     return {
-        "quality": summary_factory.create_quality_footer(qual_link),
+        "quality": quality_footer,
         "coverage": summary_factory.create_coverage_footer(cov_link)
     }
 
 
-def _read_coverage_file(hash):
+def _parse_coverage_content(content):
     """
-    Generates a coverage report with info extracted from S3 file
+    Generates a coverage report with info extracted from diff-cover output
+    in a single pass, content may be a string or a stream of lines.
     The report contains:
         "target_branch", "total", "missing", "coverage" and "files"
     """
-    content = s3.get_coverage_file(hash)
+    reader = DiffCoverReader(content)
+    if not reader.read_header():
+        return False
 
-    if content and COV_EMPTY_TEXT not in content:
-        report = {}
-        report["target_branch"] = re.search(r"Diff: (.*)\.\.\.", content).group(1)
-        report["total"] = re.search(r"Total: (.*) line", content).group(1).strip()
-        report["missing"] = re.search(r"Missing: (.*) line", content).group(1).strip()
-        report["coverage"] = re.search(r"Coverage: (.*)", content).group(1).strip()
+    report = {"target_branch": reader.get_target_branch(), "files": []}
 
-        matches = re.findall(r"(.*) \((.*)\)(.*)", content)
-        report["files"] = [
-            {"file": match[0], "value": match[1], "missing": match[2] or False}
-            for match in matches
-        ]
+    for section, line in reader:
+        if section == BODY:
+            if line == COV_EMPTY_TEXT:
+                return False
 
-        return report
+            match = COV_FILE_PATTERN.match(line)
+            if match:
+                file, value, missing = match.groups()
+                report["files"].append(
+                    {"file": file, "value": value, "missing": missing or False}
+                )
 
-    return False
+        elif section == FOOTER:
+            key, value = parse_footer_line(line)
+            if key in COV_FOOTER_FIELDS:
+                report[COV_FOOTER_FIELDS[key]] = value
 
+    return report
 
-def _read_quality_file(hash):
+
+def _parse_quality_content(content):
     """
-    Generates a quality report with info extracted from S3 file
+    Generates a quality report with info extracted from diff-quality output
     The report contains:
         "target_branch", "total", "violations", "quality", "issues" and "files"
     Rerturns a tuple with the report and quality tool
     """
-    content = s3.get_quality_file(hash)
-
     quality_adapter, tool = create_quality_adapter(content)
     report = quality_adapter.generate_report()
     return report, tool
 
 
-def _update_github_status(report, url, key, threshold, details_link):
+def _load_reports(hash, quality_tools=None):
+    """
+    Fetches coverage and quality files from S3 concurrently,
+    each one is parsed while it streams in.
+
+    When quality_tools is given, every tool has its own quality file and their
+    reports are merged into one, otherwise a single quality file is expected.
+
+    Returns a tuple with cov_report, quality_report, quality_tool (comma separated
+    when many) and timings (seconds spent until each file is available and then
+    streaming/parsing it), e.g.:
+        {"coverage": {"fetch": 0.12, "parse": 0.01}, "quality": {...}}
+    """
+    loaders = {"coverage": (s3.stream_coverage_file, _parse_coverage_content)}
+    if quality_tools:
+        for tool in quality_tools:
+            fetch = functools.partial(s3.stream_quality_file, tool=tool)
+            loaders[f"quality:{tool}"] = (fetch, _parse_quality_content)
+    else:
+        loaders["quality"] = (s3.stream_quality_file, _parse_quality_content)
+
+    def _load(name):
+        fetch, parse = loaders[name]
+
+        start = time.perf_counter()
+        lines = fetch(hash)
+        fetched = time.perf_counter()
+        try:
+            report = parse(lines)
+        finally:
+            # Parsers may stop early (e.g. empty report), S3 body is released anyway
+            if hasattr(lines, "close"):
+                lines.close()
+        parsed = time.perf_counter()
+        # Streamed files are read while parsed
+        instrumentation.record("parse", parsed - fetched)
+
+        return report, {"fetch": fetched - start, "parse": parsed - fetched}
+
+    outcomes = concurrency.fan_out(_load, loaders.keys())
+    for outcome in outcomes:
+        if not outcome.ok:
+            raise outcome.error
+
+    cov_report, *quality_results = [outcome.result[0] for outcome in outcomes]
+    timings = {outcome.item: outcome.result[1] for outcome in outcomes}
+
+    quality_reports = [(tool, report) for report, tool in quality_results]
+    quality_report = merge_quality_reports(quality_reports)
+    quality_tool = ",".join(tool for tool, _ in quality_reports)
+
+    print(f"Reports loaded: {timings}")
+    return cov_report, quality_report, quality_tool, timings
+
+
+def _create_check(report, key, threshold, details_link):
     """
-    Updates PR check status comparing data from report[key] to threshold
+    Creates a PR check comparing data from report[key] to threshold
     """
     title = key.capitalize()
 
@@ -105,38 +202,129 @@ def _update_github_status(report, url, key, threshold, details_link):
         description = "No report provided for this commit"
         details_link = ""  # If not report, don't provide the link
 
-    github.update_pr_status(url, pr_state, f"FineTune {title}", description, details_link)
+    return {
+        "state": pr_state,
+        "context": f"FineTune {title}",
+        "description": description,
+        "target_url": details_link,
+    }
 
 
-def _update_github_pr(summary_url, statuses_url, cov_report, quality_report, footers, report_links, quality_tool):
+def _create_checks(cov_report, quality_report, report_links, quality_tool):
     """
-    Updates GitHub PR with a summary and two checks for coverage and quality
+    Creates coverage and quality checks for a commit
     """
-    # Summary
-    github.write_quality_summary(
-        summary_url, cov_report, quality_report, footers["coverage"], footers["quality"]
+    cov_link = report_links.get("coverage", {}).get("url", "")
+    # Check links to the first tool when there's many of them
+    first_tool = quality_tool.split(",")[0]
+    qual_link = report_links.get(first_tool, {}).get("url", "")
+
+    return [
+        _create_check(cov_report, "coverage", COV_THRESHOLD, cov_link),
+        _create_check(quality_report, "quality", QUALITY_THRESHOLD, qual_link),
+    ]
+
+
+def _log_check_outcomes(check_outcomes):
+    for outcome in check_outcomes:
+        if not outcome.ok:
+            state = f"failed ({outcome.error!r})"
+        else:
+            state = "published" if outcome.result is not None else "unchanged"
+        print(f"Check {outcome.item['context']} {state}")
+
+
+def _publish_checks(statuses_url, checks):
+    """
+    Publishes checks alone, for when the summary is already up to date.
+
+    Returns the outcome of every check.
+    """
+    check_outcomes = github.publish_statuses(statuses_url, checks)
+    _log_check_outcomes(check_outcomes)
+
+    for outcome in check_outcomes:
+        if not outcome.ok:
+            raise outcome.error
+
+    return check_outcomes
+
+
+def _update_github_pr(
+    summary_url,
+    statuses_url,
+    cov_report,
+    quality_report,
+    footers,
+    report_links,
+    quality_tool,
+):
+    """
+    Updates GitHub PR with a summary and two checks for coverage and quality.
+    They don't depend on each other, so all of them are sent at once.
+
+    Returns the outcome of every check.
+    """
+    checks = _create_checks(cov_report, quality_report, report_links, quality_tool)
+
+    def _write_summary():
+        return github.write_quality_summary(
+            summary_url,
+            cov_report,
+            quality_report,
+            footers["coverage"],
+            footers["quality"],
+        )
+
+    def _publish_statuses():
+        return github.publish_statuses(statuses_url, checks)
+
+    summary, statuses = concurrency.fan_out(
+        lambda publish: publish(), [_write_summary, _publish_statuses]
     )
+    check_outcomes = statuses.result if statuses.ok else []
+    _log_check_outcomes(check_outcomes)
 
-    # PR checks
-    cov_link = report_links.get("coverage", {}).get("url", "")
-    qual_link = report_links.get(quality_tool, {}).get("url", "")
+    # Everything was attempted, now let error handler know about failures
+    for outcome in [summary, statuses, *check_outcomes]:
+        if not outcome.ok:
+            raise outcome.error
+
+    return check_outcomes
+
+
+def _get_status_reports(status):
+    """
+    Rebuilds reports from a status read (see dynamodb.get_report_status),
+    they only carry what checks need.
+    Returns False when the item is too old to have values for checks.
+    """
+    if "coverage" not in status or "quality" not in status:
+        return False
 
-    _update_github_status(cov_report, statuses_url, "coverage", COV_THRESHOLD, cov_link)
-    _update_github_status(quality_report, statuses_url, "quality", QUALITY_THRESHOLD, qual_link)
+    cov_report = {"coverage": status["coverage"]} if status["coverage"] else False
+    quality_report = {"quality": status["quality"]} if status["quality"] else False
+    return cov_report, quality_report
 
 
 # Although it's CI, GitHub fail response fits good though
+@instrumentation.instrumented("quality_summary.ci_handler")
 @error_handler.wrapper_for("github")
 @security.secret_handler("Ft-Signature")
 def ci_handler(event, context):
     """
     Expects to receive a payload from CircleCI with following info:
-    "commit_sha", "owner", "project", "build_num", "pr_link" (pr_link might be empty).
+    "commit_sha", "owner", "project", "build_num", "pr_link" (pr_link might be empty)
+    and "quality_tools" (optional, when there's a quality file per tool).
     """
     cievent = json.loads(event.get("body"))
 
-    cov_report = _read_coverage_file(cievent["commit_sha"])
-    quality_report, quality_tool = _read_quality_file(cievent["commit_sha"])
+    # Optional, tools that uploaded their own quality/{sha}/{tool} file
+    quality_tools = cievent.pop("quality_tools", None)
+
+    cov_report, quality_report, quality_tool, _ = _load_reports(
+        cievent["commit_sha"], quality_tools
+    )
     dynamodb.save_reports(cov_report, quality_report, quality_tool, **cievent)
 
     reference = CircleCommitDTO.create_from_circleci(cievent, quality_tool)
@@ -152,12 +340,14 @@ def ci_handler(event, context):
         _update_github_pr(
             summary_url, statuses_url, cov_report, quality_report, footers, report_links, quality_tool
         )
+        summarized_commits.set(summary_url, reference.commit_sha)
     else:
         print("CI event will be ignored because PR_LINK is empty")
 
     return OK_RESPONSE
 
 
+@instrumentation.instrumented("quality_summary.gh_handler")
 @error_handler.wrapper_for("github")
 @security.secret_handler("X-Hub-Signature")
 def gh_handler(event, context):
@@ -167,20 +357,42 @@ def gh_handler(event, context):
     statuses_url = ghevent["pull_request"]["statuses_url"]
     commit_sha = ghevent["pull_request"]["head"]["sha"]
     repo_id = ghevent["repository"]["id"]
-    report = dynamodb.get_report(commit_sha)
-
-    if report:
-        reference = CircleCommitDTO.create_from_dynamodb(report, repo_id)
-        report_links = reference.get_reports_links()
-        footers = _get_footers(reference)
+    owner, project = ghevent["repository"]["full_name"].split("/")
+    # Saves ci_handler a round trip to GitHub later on
+    github.remember_repo_id(owner, project, repo_id)
 
-        cov_report = report.get("cov_report", False)
-        quality_report = report.get("quality_report", False)
+    # Checks only need a few fields, full reports are read just for the summary
+    status = dynamodb.get_report_status(commit_sha)
 
-        _update_github_pr(
-            summary_url, statuses_url, cov_report, quality_report, footers, report_links, reference.quality_tool
-        )
-    else:
+    if not status:
         print(f"No report found for {commit_sha}")
+        return OK_RESPONSE
+
+    reference = CircleCommitDTO.create_from_dynamodb(status, repo_id)
+    report_links = reference.get_reports_links()
+    status_reports = _get_status_reports(status)
+
+    if status_reports and summarized_commits.get(summary_url) == commit_sha:
+        print(f"Summary is up to date with {commit_sha}, publishing checks only")
+        checks = _create_checks(*status_reports, report_links, reference.quality_tool)
+        _publish_checks(statuses_url, checks)
+        return OK_RESPONSE
+
+    report = dynamodb.get_report(commit_sha)
+    footers = _get_footers(reference)
+
+    cov_report = report.get("cov_report", False)
+    quality_report = report.get("quality_report", False)
+
+    _update_github_pr(
+        summary_url,
+        statuses_url,
+        cov_report,
+        quality_report,
+        footers,
+        report_links,
+        reference.quality_tool,
+    )
+    summarized_commits.set(summary_url, commit_sha)
 
     return OK_RESPONSE
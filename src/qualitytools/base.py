@@ -1,30 +1,70 @@
 import re
 
+from .diffcover import BODY, FOOTER, DiffCoverReader, parse_footer_line
+
 QUALITY_EMPTY_TEXT = "No lines with quality information in this diff."
+FOOTER_FIELDS = {"Total": "total", "Violations": "violations", "% Quality": "quality"}
+
+# e.g. "path/to/models.py (80.0%):", value must be a percentage so issues
+# containing parentheses never match. File is "unrolled" (runs of anything but
+# "(", then "(" not starting a percentage) to avoid backtracking on long lines
+FILE_NAME = r"(?P<file>[^(]+(?:\((?!\d)[^(]*)*)"
+FILE_PATTERN = re.compile(rf"^{FILE_NAME} \((?P<value>\d+(?:\.\d+)?%)\):?$")
 
 
 class BaseQualityAdapter:
+    """
+    Builds a quality report out of a diff-quality output in a single pass.
+
+    Subclasses declare in PATTERNS how "issue" and "file" lines look like for
+    their tool. Patterns are compiled once and anchored to the whole line,
+    issue patterns must provide file, line, error_code and description groups.
+    """
+
+    PATTERNS = {"issue": None, "file": FILE_PATTERN}
+
     def __init__(self, content):
-        self.content = content
-
-    def _get_base_report(self):
-        """
-        Reads header and footer
-        """
-        report = {}
-        report["target_branch"] = re.search(r"Diff: (.*)\.\.\.", self.content).group(1)
-        report["total"] = re.search(r"Total: (.*) line", self.content).group(1).strip()
-        report["violations"] = re.search(r"Violations: (.*) line", self.content).group(1).strip()
-        report["quality"] = re.search(r"Quality: (.*)", self.content).group(1).strip()
-        return report
+        if isinstance(content, DiffCoverReader):
+            self.reader = content
+        else:
+            self.reader = DiffCoverReader(content)
+
+    def _parse_issue(self, line):
+        match = self.PATTERNS["issue"].match(line)
+        return match.groupdict() if match else None
 
-    def _process_content(self):
-        pass
+    def _parse_file(self, line):
+        match = self.PATTERNS["file"].match(line)
+        return match.groupdict() if match else None
 
     def generate_report(self):
-        if self.content and QUALITY_EMPTY_TEXT not in self.content:
-            base_report = self._get_base_report()
-            content_report = self._process_content()
-            return {**base_report, **content_report}
+        if not self.reader.read_header():
+            return False
 
-        return False
+        report = {
+            "target_branch": self.reader.get_target_branch(),
+            "issues": [],
+            "files": [],
+        }
+
+        for section, line in self.reader:
+            if section == BODY:
+                if line == QUALITY_EMPTY_TEXT:
+                    return False
+
+                # Issue lines may look like file lines, so they come first
+                issue = self._parse_issue(line)
+                if issue:
+                    report["issues"].append(issue)
+                    continue
+
+                file = self._parse_file(line)
+                if file:
+                    report["files"].append(file)
+
+            elif section == FOOTER:
+                key, value = parse_footer_line(line)
+                if key in FOOTER_FIELDS:
+                    report[FOOTER_FIELDS[key]] = value
+
+        return report
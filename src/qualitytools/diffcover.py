@@ -0,0 +1,107 @@
+SEPARATOR = "-------------"
+
+# Sections of a report, in the order they show up
+START, HEADER, BODY, FOOTER, END = range(5)
+
+
+def parse_footer_line(line):
+    """
+    Splits a footer line into key and value, e.g.:
+        "Total:   589 lines" -> ("Total", "589")
+        "% Quality: 99%" -> ("% Quality", "99%")
+    """
+    key, _, value = line.partition(":")
+    value = value.strip()
+
+    if value.endswith(" line") or value.endswith(" lines"):
+        value = value.rsplit(" ", 1)[0]
+
+    return key.strip(), value
+
+
+class DiffCoverReader:
+    """
+    Single pass, line oriented reader for diff-cover and diff-quality outputs:
+
+        -------------
+        Diff Quality                                     <- header
+        Quality Report: flake8
+        Diff: origin/dev...HEAD, staged and unstaged changes
+        -------------
+        path/models.py (80.0%):                          <- body
+        path/models.py:3: F401 'String' imported but unused
+        -------------
+        Total:   589 lines                               <- footer
+        Violations: 5 lines
+        % Quality: 99%
+        -------------
+
+    Lines are pulled one at a time as the reader gets iterated, so content may be
+    a stream (e.g. S3 body) and is never loaded as a whole.
+    Content may also be a plain string (or False for missing files).
+    """
+
+    def __init__(self, content):
+        if not content:
+            content = []
+        elif isinstance(content, str):
+            content = content.splitlines()
+
+        self.section = START
+        self.header = []
+        self._lines = iter(content)
+        self._classified = self._classify()
+        self._header_read = False
+        self._pending = None
+
+    def _classify(self):
+        for line in self._lines:
+            line = line.rstrip()
+
+            if line == SEPARATOR:
+                self.section += 1
+            elif line:
+                yield self.section, line
+
+    def read_header(self):
+        """
+        Consumes lines up to the body, returns header lines
+        """
+        if not self._header_read:
+            for section, line in self._classified:
+                if section > HEADER:
+                    self._pending = (section, line)
+                    break
+
+                self.header.append(line)
+
+            self._header_read = True
+
+        return self.header
+
+    def get_header_field(self, name):
+        """
+        Returns the value of a "name: value" header line, or None
+        """
+        prefix = f"{name}: "
+        for line in self.read_header():
+            if line.startswith(prefix):
+                return line[len(prefix):].strip()
+
+        return None
+
+    def get_target_branch(self):
+        diff = self.get_header_field("Diff") or ""
+        return diff.rpartition("...")[0]
+
+    def __iter__(self):
+        """
+        Yields (section, line) for every non empty body and footer line
+        """
+        self.read_header()
+
+        if self._pending:
+            yield self._pending
+            self._pending = None
+
+        yield from self._classified
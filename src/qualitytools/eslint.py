@@ -1,17 +1,16 @@
 import re
-from .base import BaseQualityAdapter
 
+from .base import FILE_PATTERN, BaseQualityAdapter
+from .registry import register_adapter
 
-class EslintAdapter(BaseQualityAdapter):
-    def _process_content(self):
-        report = {}
-
-        matches = re.findall(r"(.*):(\d+): (.*) - (.*)", self.content)
-        report["issues"] = [
-            {"file": match[0], "line": match[1], "error_code": match[2], "description": match[3]} for match in matches
-        ]
 
-        matches = re.findall(r"(.*) \((\d.*)\)", self.content)
-        report["files"] = [{"file": match[0], "value": match[1]} for match in matches]
-
-        return report
+@register_adapter("eslint")
+class EslintAdapter(BaseQualityAdapter):
+    PATTERNS = {
+        # e.g. "frontend/src/core/App.js:14: Error - Missing semicolon. (semi)"
+        "issue": re.compile(
+            r"^(?P<file>[^:]+):(?P<line>\d+): "
+            r"(?P<error_code>\w+) - (?P<description>.*)$"
+        ),
+        "file": FILE_PATTERN,
+    }
@@ -1,13 +1,17 @@
-from .flake8 import Flake8Adapter
-from .eslint import EslintAdapter
-
-adapter_map = {"flake8": Flake8Adapter, "eslint": EslintAdapter}
+from .diffcover import DiffCoverReader
+from .registry import get_adapter
 
 
 def create_quality_adapter(content):
-    for key in adapter_map.keys():
-        if f"Quality Report: {key}" in content:
-            adapter = adapter_map[key]
-            return adapter(content), key
+    """
+    Picks the adapter from the "Quality Report: {tool}" line, reading
+    only the report header. Content may be a string or a stream of lines.
+    """
+    reader = DiffCoverReader(content)
+    tool = reader.get_header_field("Quality Report")
+    adapter = get_adapter(tool)
+
+    if adapter is None:
+        raise Exception("Unknown adapter")
 
-    raise Exception("Unknown adapter")
+    return adapter(reader), tool
@@ -1,17 +1,16 @@
 import re
-from .base import BaseQualityAdapter
 
+from .base import FILE_PATTERN, BaseQualityAdapter
+from .registry import register_adapter
 
-class Flake8Adapter(BaseQualityAdapter):
-    def _process_content(self):
-        report = {}
-
-        matches = re.findall(r"(.*):(\d+): ([A-Z]\d+) (.*)", self.content)
-        report["issues"] = [
-            {"file": match[0], "line": match[1], "error_code": match[2], "description": match[3]} for match in matches
-        ]
 
-        matches = re.findall(r"(.*) \((.*)\)", self.content)
-        report["files"] = [{"file": match[0], "value": match[1]} for match in matches]
-
-        return report
+@register_adapter("flake8")
+class Flake8Adapter(BaseQualityAdapter):
+    PATTERNS = {
+        # e.g. "path/to/models.py:3: F401 'sqlalchemy.String' imported but unused"
+        "issue": re.compile(
+            r"^(?P<file>[^:]+):(?P<line>\d+): "
+            r"(?P<error_code>[A-Z]+\d+) (?P<description>.*)$"
+        ),
+        "file": FILE_PATTERN,
+    }
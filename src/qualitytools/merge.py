@@ -0,0 +1,47 @@
+def _get_percentage(value):
+    return float(value.rstrip("%"))
+
+
+def merge_quality_reports(reports):
+    """
+    Combines reports from several tools (e.g. flake8 and eslint) run on the
+    same commit into a single one, reports is a list of (tool, report).
+
+        total/violations: sum of every tool
+        quality: computed out of them the same way diff-quality does
+        issues: all of them, each one tagged with its tool
+        files: one entry per file with the worst value among tools
+
+    Empty reports (False) are skipped, returns False if all of them are empty.
+    """
+    reports = [(tool, report) for tool, report in reports if report]
+    if not reports:
+        return False
+
+    if len(reports) == 1:
+        return reports[0][1]
+
+    total = sum(int(report["total"]) for _, report in reports)
+    violations = sum(int(report["violations"]) for _, report in reports)
+    quality = int(100 * (total - violations) / total) if total else 100
+
+    issues = []
+    files = {}
+    for tool, report in reports:
+        issues.extend({**issue, "tool": tool} for issue in report["issues"])
+
+        for file in report["files"]:
+            current = files.get(file["file"])
+            if current is None or _get_percentage(file["value"]) < _get_percentage(
+                current["value"]
+            ):
+                files[file["file"]] = file
+
+    return {
+        "target_branch": reports[0][1]["target_branch"],
+        "total": str(total),
+        "violations": str(violations),
+        "quality": f"{quality}%",
+        "issues": issues,
+        "files": list(files.values()),
+    }
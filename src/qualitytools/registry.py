@@ -0,0 +1,41 @@
+import importlib
+
+# Adapters by tool (as named in "Quality Report: {tool}" header)
+_adapters = {}
+
+# Modules (relative to this package) registering the adapter of a tool.
+# They're only imported when their tool shows up, so cold start doesn't
+# pay for adapters that aren't used.
+_adapter_modules = {
+    "flake8": ".flake8",
+    "eslint": ".eslint",
+}
+
+
+def register_adapter(tool):
+    """
+    Class decorator registering an adapter for tool
+    """
+    def _register(adapter):
+        _adapters[tool] = adapter
+        return adapter
+
+    return _register
+
+
+def register_adapter_module(tool, module):
+    """
+    Lets get_adapter know where to find (lazily) the adapter of tool
+    """
+    _adapter_modules[tool] = module
+
+
+def get_adapter(tool):
+    """
+    Returns adapter registered for tool, importing its module if needed.
+    Returns None for unknown tools.
+    """
+    if tool not in _adapters and tool in _adapter_modules:
+        importlib.import_module(_adapter_modules[tool], __package__)
+
+    return _adapters.get(tool)
@@ -1,16 +1,62 @@
 import logging
 import os
-
-import requests
+import re
+import time
+from urllib.parse import urlencode
 
 try:
     from thirdparties import summary_factory
+    from thirdparties.ratelimit import RateLimiter
+    from cache import TieredCache
+    import concurrency
+    import instrumentation
 except ModuleNotFoundError:  # For tests
     from . import summary_factory
+    from .ratelimit import RateLimiter
+    from ..cache import TieredCache
+    from .. import concurrency
+    from .. import instrumentation
 
 
 logger = logging.getLogger()
 
+# Connection pool, shared by every call made within a (warm) Lambda container
+POOL_SIZE = int(os.environ.get("GITHUB_POOL_SIZE", 10))
+MAX_RETRIES = int(os.environ.get("GITHUB_MAX_RETRIES", 3))
+BACKOFF_FACTOR = float(os.environ.get("GITHUB_BACKOFF_FACTOR", 0.3))
+TIMEOUT = float(os.environ.get("GITHUB_TIMEOUT", 10))
+RETRY_STATUSES = (500, 502, 503, 504)
+# Retries for requests refused by rate limits, when GitHub tells how long to wait
+RATE_LIMIT_RETRIES = int(os.environ.get("GITHUB_RATE_LIMIT_RETRIES", 2))
+# Max allowed by GitHub, default is 30
+PER_PAGE = 100
+GRAPHQL_URL = "https://api.github.com/graphql"
+# Repos queried at once by get_open_pr_heads, each one is a field of the same query
+GRAPHQL_REPOS_PER_QUERY = int(os.environ.get("GITHUB_GRAPHQL_REPOS_PER_QUERY", 20))
+# Responses kept around to be revalidated with If-None-Match
+ETAG_CACHE_SIZE = int(os.environ.get("GITHUB_ETAG_CACHE_SIZE", 256))
+# Sharing them through the cache table costs a write per read, so it's opt-in
+PERSIST_ETAGS = os.environ.get("GITHUB_PERSIST_ETAGS", "false").lower() == "true"
+ETAG_CACHE_TTL = int(os.environ.get("GITHUB_ETAG_CACHE_TTL", 24 * 60 * 60))
+# Bigger responses are only cached in memory (DynamoDB items are limited to 400KB)
+ETAG_MAX_PERSISTENT_SIZE = int(
+    os.environ.get("GITHUB_ETAG_MAX_PERSISTENT_SIZE", 64 * 1024)
+)
+# Our summaries live as long as their PR, an entry deleted meanwhile just costs a scan
+COMMENT_INDEX_TTL = int(os.environ.get("COMMENT_INDEX_TTL", 30 * 24 * 60 * 60))
+
+# Repo ids never change, the TTL only bounds stale entries (e.g. repo recreated)
+REPO_ID_CACHE_TTL = int(os.environ.get("REPO_ID_CACHE_TTL", 7 * 24 * 60 * 60))
+
+# Only statuses GitHub doesn't show yet are sent, at the cost of reading them first
+SKIP_UNCHANGED_STATUSES = (
+    os.environ.get("SKIP_UNCHANGED_STATUSES", "false").lower() == "true"
+)
+
+# Texts that identify our summaries among PR comments
+STANDARD_SUMMARY_KEYS = ["Guidelines Report"]
+QUALITY_SUMMARY_KEYS = ["Quality Report", "Coverage Report"]
+
 
 class GitHubException(Exception):
     def __init__(self, url, response_text):
@@ -19,6 +65,197 @@ class GitHubException(Exception):
         self.response_text = response_text
 
 
+class GitHubClient:
+    """
+    Thin wrapper around a pooled, keep-alive requests.Session.
+
+    Idempotent requests (GET, PUT, DELETE...) are retried with exponential
+    backoff when GitHub answers with a 5xx, POST and PATCH are never retried.
+
+    GET responses carrying an ETag are cached, so reading them again becomes a
+    conditional request: a 304 is free in the rate limit and replays the cache.
+
+    Every request goes through rate_limiter, which adapts concurrency to the
+    remaining budget. Rate limited requests (any method, GitHub didn't process
+    them) are retried after the time GitHub asks for.
+    """
+
+    def __init__(
+        self, pool_size=POOL_SIZE, max_retries=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR, timeout=TIMEOUT
+    ):
+        # requests is only imported once a client is needed, it's slow to import
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.timeout = timeout
+        self.session = requests.Session()
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.etag_cache = TieredCache(
+            "etag",
+            maxsize=ETAG_CACHE_SIZE,
+            ttl=ETAG_CACHE_TTL,
+            persistent=PERSIST_ETAGS,
+            max_persistent_size=ETAG_MAX_PERSISTENT_SIZE,
+        )
+        # The client uses a single token, so it's a single budget too
+        self.rate_limiter = RateLimiter(pool_size)
+
+    def _send(self, method, url, headers, **kwargs):
+        resource = "graphql" if url.endswith("/graphql") else "core"
+
+        self.rate_limiter.acquire(resource)
+        try:
+            start = time.perf_counter()
+            response = self.session.request(method, url, headers=headers, **kwargs)
+            instrumentation.record(
+                "github",
+                time.perf_counter() - start,
+                len(response.content or b""),
+            )
+        finally:
+            self.rate_limiter.release()
+
+        self.rate_limiter.update(response.headers)
+        return response
+
+    def request(self, method, url, headers=None, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        headers = {**_get_gh_headers(), **(headers or {})}
+
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            response = self._send(method, url, headers, **kwargs)
+
+            delay = self.rate_limiter.get_retry_delay(response)
+            if (
+                delay is None
+                or attempt == RATE_LIMIT_RETRIES
+                or not self.rate_limiter.wait(delay)
+            ):
+                break
+
+            print(f"Retrying rate limited {method} {url}")
+
+        return response
+
+    def get(self, url, params=None, **kwargs):
+        key = _get_cache_key(url, params)
+        cached = self.etag_cache.get(key)
+
+        headers = {"If-None-Match": cached["etag"]} if cached else None
+        response = self.request("GET", url, params=params, headers=headers, **kwargs)
+
+        if cached and response.status_code == 304:
+            return _replay_response(key, cached)
+
+        if response.ok and "ETag" in response.headers:
+            self.etag_cache.set(key, {
+                "etag": response.headers["ETag"],
+                "link": response.headers.get("Link", ""),
+                "body": response.text,
+            })
+
+        return response
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+
+def _get_cache_key(url, params=None):
+    if not params:
+        return url
+
+    separator = "&" if "?" in url else "?"
+    return url + separator + urlencode(sorted(params.items()))
+
+
+def _replay_response(url, cached):
+    """
+    Rebuilds a 200 response out of a cached one
+    """
+    import requests
+
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.encoding = "utf-8"
+    response._content = cached["body"].encode("utf-8")
+    response.headers["ETag"] = cached["etag"]
+    if cached["link"]:
+        response.headers["Link"] = cached["link"]
+
+    return response
+
+
+_client = None
+# Our summaries comment urls, by repo, PR number and kind (see _get_summary_key)
+comment_index = TieredCache("comment", ttl=COMMENT_INDEX_TTL)
+# Repo ids by owner/repo
+repo_ids = TieredCache("repo_id", maxsize=128, ttl=REPO_ID_CACHE_TTL)
+
+
+def get_client():
+    """
+    Returns the module scoped client, created on first use so it lives
+    (and keeps its connections open) across warm invocations.
+    """
+    global _client
+
+    if _client is None:
+        _client = GitHubClient()
+
+    return _client
+
+
+class PageIterator:
+    """
+    Lazily iterates over every item of a paginated GitHub endpoint,
+    following the "next" url from Link headers.
+
+    Pages are only requested when needed, so callers may stop early.
+    `pages` tells how many were fetched so far.
+    """
+
+    def __init__(self, url, params=None):
+        self.url = url
+        self.params = {"per_page": PER_PAGE, **(params or {})}
+        self.pages = 0
+
+    def __iter__(self):
+        url, params = self.url, self.params
+
+        while url:
+            response = get_client().get(url, params=params)
+            if not response.ok:
+                raise GitHubException(url, response.text)
+
+            self.pages += 1
+            yield from response.json()
+
+            # Next url already carries all params
+            url, params = response.links.get("next", {}).get("url"), None
+
+        print(f"Fetched {self.pages} page(s) from {self.url}")
+
+
 def _get_gh_headers():
     token = os.environ["GITHUB_TOKEN"]
     return {
@@ -34,13 +271,9 @@ def _get_comment_url(url, *args):
     It also makes sure the owner of that comment has the same username set
     in env var GITHUB_USER, to avoid mistakes.
     """
-    headers = _get_gh_headers()
     USER = os.environ.get("GITHUB_USER")
 
-    response = requests.get(url, headers=headers)
-    comments = response.json()
-
-    for comment in comments:
+    for comment in PageIterator(url):
         if any(text in comment["body"] for text in args):
             if comment["user"]["login"] == USER:
                 return comment["url"]
@@ -50,57 +283,317 @@ def _get_comment_url(url, *args):
 
 
 def get_commits(url):
-    headers = _get_gh_headers()
-    response = requests.get(url, headers=headers)
-    return response.json()
+    return list(PageIterator(url))
+
+
+def get_compared_commits(compare_url, base, head):
+    """
+    Returns commits added on top of base up to head, oldest first.
+    compare_url is the repo compare url: .../compare/{base}...{head}
+
+    Returns None when head isn't just ahead of base (e.g. after a force push)
+    or when GitHub truncated the list, callers need every commit then.
+    """
+    url = compare_url.format(base=base, head=head)
+    response = get_client().get(url)
+    if not response.ok:
+        raise GitHubException(url, response.text)
+
+    comparison = response.json()
+    commits = comparison["commits"]
+    if comparison["status"] != "ahead" or comparison["total_commits"] != len(commits):
+        return None
+
+    return commits
 
 
 def update_pr_status(url, state, check_title, check_description="", details_url=""):
-    headers = _get_gh_headers()
     body = {"context": check_title, "description": check_description, "state": state, "target_url": details_url}
 
-    return requests.post(url, json=body, headers=headers)
+    return get_client().post(url, json=body)
+
+
+def _get_combined_status_url(url):
+    """
+    Statuses url (repos/:owner/:repo/statuses/:sha) to its combined status
+    url (repos/:owner/:repo/commits/:sha/status)
+    """
+    base, sha = url.rsplit("/statuses/", 1)
+    return f"{base}/commits/{sha}/status"
+
+
+def get_current_statuses(url):
+    """
+    Returns the latest status of every context of a commit, by context.
+    url is the commit statuses url.
+    """
+    combined_url = _get_combined_status_url(url)
+    response = get_client().get(combined_url, params={"per_page": PER_PAGE})
+    if not response.ok:
+        raise GitHubException(combined_url, response.text)
+
+    return {status["context"]: status for status in response.json()["statuses"]}
+
+
+def _is_status_unchanged(check, current):
+    return current is not None and all(
+        (current.get(field) or "") == (check.get(field) or "")
+        for field in ("state", "description", "target_url")
+    )
+
+
+def filter_unchanged_statuses(url, checks):
+    """
+    Reads current statuses once and returns only checks that would change them.
+    When statuses can't be read, all checks are returned.
+    """
+    try:
+        current = get_current_statuses(url)
+    except Exception as ex:
+        logger.error(f"Unable to read current statuses from {url}: {ex!r}")
+        return checks
+
+    return [
+        check for check in checks
+        if not _is_status_unchanged(check, current.get(check["context"]))
+    ]
+
+
+def publish_statuses(url, checks, skip_unchanged=None):
+    """
+    Sends all checks to the same statuses url concurrently.
+    Every check is a dict with: state, context, description and target_url.
+
+    With skip_unchanged (defaults to SKIP_UNCHANGED_STATUSES) checks GitHub
+    already shows are not sent again.
+
+    Returns a list of concurrency.Outcome (one per check), a check failed when
+    it raised or GitHub didn't accept it. Skipped checks have no result.
+    """
+    if skip_unchanged is None:
+        skip_unchanged = SKIP_UNCHANGED_STATUSES
+
+    changed = filter_unchanged_statuses(url, checks) if skip_unchanged else checks
+    if skip_unchanged:
+        skipped = len(checks) - len(changed)
+        print(f"Skipped {skipped} unchanged status(es) out of {len(checks)}")
+    changed_ids = {id(check) for check in changed}
+
+    def _publish(check):
+        if id(check) not in changed_ids:
+            return None
+
+        response = update_pr_status(
+            url,
+            check["state"],
+            check["context"],
+            check["description"],
+            check["target_url"],
+        )
+        if not response.ok:
+            raise GitHubException(url, response.text)
+
+        return response
+
+    return concurrency.fan_out(_publish, checks)
 
 
 def get_open_prs(repo):
-    url = f"https://api.github.com/repos/{repo}/pulls?state=open"
-    headers = _get_gh_headers()
+    url = f"https://api.github.com/repos/{repo}/pulls"
+    return list(PageIterator(url, {"state": "open"}))
+
+
+def _create_open_prs_query(count):
+    """
+    Query for open PRs of count repos, repo i is aliased as r{i} and takes
+    its own r{i}_owner, r{i}_name and r{i}_cursor variables.
+    """
+    definitions = []
+    fields = []
+
+    for i in range(count):
+        alias = f"r{i}"
+        definitions.append(
+            f"${alias}_owner: String!, ${alias}_name: String!, ${alias}_cursor: String"
+        )
+        fields.append(
+            f"{alias}: repository(owner: ${alias}_owner, name: ${alias}_name) {{"
+            f" pullRequests(states: OPEN, first: {PER_PAGE}, after: ${alias}_cursor) {{"
+            " pageInfo { hasNextPage endCursor } nodes { number headRefOid } } }"
+        )
+
+    return f"query({', '.join(definitions)}) {{ {' '.join(fields)} }}"
+
+
+def _query_open_prs(batch):
+    """
+    batch is a list of (repo, cursor), returns GraphQL data by alias.
+    Raises GitHubException when the whole query failed (e.g. bad credentials
+    or an invalid query) even though GitHub answers 200.
+    """
+    variables = {}
+    for i, (repo, cursor) in enumerate(batch):
+        owner, name = repo.split("/")
+        variables.update(
+            {f"r{i}_owner": owner, f"r{i}_name": name, f"r{i}_cursor": cursor}
+        )
+
+    query = _create_open_prs_query(len(batch))
+    response = get_client().post(
+        GRAPHQL_URL, json={"query": query, "variables": variables}
+    )
+    if not response.ok:
+        raise GitHubException(GRAPHQL_URL, response.text)
+
+    payload = response.json()
+    if payload.get("data") is None:
+        raise GitHubException(GRAPHQL_URL, response.text)
+
+    if payload.get("errors"):
+        # e.g. a repo that doesn't exist, others are still answered
+        logger.error(f"GraphQL errors: {payload['errors']}")
+
+    return payload["data"]
 
-    response = requests.get(url, headers=headers)
-    return response.json()
+
+def get_open_pr_heads(repos):
+    """
+    Lists open PRs (just number, head sha and statuses_url) from many repos
+    through as few GraphQL queries as possible, repos with more PRs than a
+    page are queried again with their cursor.
+
+    Returns a tuple with all PRs found and the repos that failed.
+    """
+    prs = []
+    failed_repos = []
+    pending = [(repo, None) for repo in repos]
+    queries = 0
+
+    while pending:
+        batch = pending[:GRAPHQL_REPOS_PER_QUERY]
+        pending = pending[GRAPHQL_REPOS_PER_QUERY:]
+        data = _query_open_prs(batch)
+        queries += 1
+
+        for i, (repo, _) in enumerate(batch):
+            result = data.get(f"r{i}")
+            if not result:
+                failed_repos.append(repo)
+                continue
+
+            connection = result["pullRequests"]
+            statuses_url = f"https://api.github.com/repos/{repo}/statuses/"
+            prs.extend(
+                {
+                    "repo": repo,
+                    "number": node["number"],
+                    "sha": node["headRefOid"],
+                    "statuses_url": statuses_url + node["headRefOid"],
+                }
+                for node in connection["nodes"]
+            )
+
+            if connection["pageInfo"]["hasNextPage"]:
+                pending.append((repo, connection["pageInfo"]["endCursor"]))
+
+    print(
+        f"Fetched {len(prs)} open PR(s) from {len(repos)} repo(s)"
+        f" in {queries} GraphQL query(ies)"
+    )
+    return prs, failed_repos
+
+
+def remember_repo_id(owner, repo, repo_id):
+    """
+    Feeds repo_ids with ids we get for free (e.g. from webhook payloads)
+    """
+    key = f"{owner}/{repo}"
+    if repo_ids.get(key) != repo_id:
+        repo_ids.set(key, repo_id)
 
 
 def get_repo_id(owner, repo):
-    url = f"https://api.github.com/repos/{owner}/{repo}"
-    headers = _get_gh_headers()
+    key = f"{owner}/{repo}"
+    repo_id = repo_ids.get(key)
 
-    response = requests.get(url, headers=headers)
-    content = response.json()
-    return content["id"]
+    if repo_id is None:
+        url = f"https://api.github.com/repos/{owner}/{repo}"
+        response = get_client().get(url)
+        content = response.json()
+        repo_id = content["id"]
+        repo_ids.set(key, repo_id)
 
+    return repo_id
 
-def delete_standard_summary(url):
-    delete_url = _get_comment_url(url, "Guidelines Report")
-    if delete_url:
-        headers = _get_gh_headers()
-        return requests.delete(delete_url, headers=headers)
 
+def _get_summary_key(url, kind):
+    """
+    Identifies a summary by repo, PR number and kind.
+    Expected url format:
+        https://api.github.com/repos/:owner/:repo/issues/:number/comments
+    """
+    match = re.search(r"repos/([^/]+/[^/]+)/issues/(\d+)/comments", url)
+    if match:
+        return f"{match.group(1)}#{match.group(2)}:{kind}"
+
+    return f"{url}:{kind}"
 
-def write_standard_summary(url, report, resume):
-    headers = _get_gh_headers()
-    body = {"body": summary_factory.create_standard_summary(report, resume)}
 
-    edit_url = _get_comment_url(url, "Guidelines Report")
+def _write_summary(url, kind, body, *args):
+    """
+    Edits our previous summary or creates a new one.
+
+    The comment url is kept in comment_index, so we only look for the summary
+    among PR comments when it's unknown or was deleted meanwhile (404).
+    """
+    key = _get_summary_key(url, kind)
+    comment_url = comment_index.get(key)
+
+    if comment_url:
+        response = get_client().patch(comment_url, json=body)
+        if response.status_code != 404:
+            return response
+
+        print(f"Summary {comment_url} no longer exists, looking for it")
+        comment_index.delete(key)
+
+    edit_url = _get_comment_url(url, *args)
     if edit_url:
-        return requests.patch(edit_url, json=body, headers=headers)
+        response = get_client().patch(edit_url, json=body)
+    else:
+        response = get_client().post(url, json=body)
 
-    return requests.post(url, json=body, headers=headers)
+    if response.ok:
+        comment_index.set(key, response.json()["url"])
 
+    return response
 
-def write_quality_summary(url, cov_report, quality_report, cov_footer, quality_footer):
-    headers = _get_gh_headers()
 
-    comment_keys_to_find = ["Quality Report", "Coverage Report"]
+def _delete_summary(url, kind, *args):
+    key = _get_summary_key(url, kind)
+    comment_url = comment_index.get(key)
+
+    if comment_url:
+        comment_index.delete(key)
+        response = get_client().delete(comment_url)
+        if response.status_code != 404:
+            return response
+
+    delete_url = _get_comment_url(url, *args)
+    if delete_url:
+        return get_client().delete(delete_url)
+
+
+def delete_standard_summary(url):
+    return _delete_summary(url, "standard", *STANDARD_SUMMARY_KEYS)
+
+
+def write_standard_summary(url, report, resume):
+    body = {"body": summary_factory.create_standard_summary(report, resume)}
+    return _write_summary(url, "standard", body, *STANDARD_SUMMARY_KEYS)
+
+
+def write_quality_summary(url, cov_report, quality_report, cov_footer, quality_footer):
     if cov_report or quality_report:
         cov_summary = summary_factory.create_coverage_summary(cov_report, cov_footer)
         quality_summary = summary_factory.create_quality_summary(
@@ -108,18 +601,10 @@ def write_quality_summary(url, cov_report, quality_report, cov_footer, quality_f
         )
 
         body = {"body": f"{cov_summary}\n{quality_summary}"}
-
-        edit_url = _get_comment_url(url, *comment_keys_to_find)
-        if edit_url:
-            return requests.patch(edit_url, json=body, headers=headers)
-        else:
-            return requests.post(url, json=body, headers=headers)
+        return _write_summary(url, "quality", body, *QUALITY_SUMMARY_KEYS)
     else:
         print(
             "No report provided, so no summary to write."
             + "Let's check if we need to delete something."
         )
-        delete_url = _get_comment_url(url, *comment_keys_to_find)
-
-        if delete_url:
-            return requests.delete(delete_url, headers=headers)
+        return _delete_summary(url, "quality", *QUALITY_SUMMARY_KEYS)
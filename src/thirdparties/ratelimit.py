@@ -0,0 +1,141 @@
+import logging
+import os
+import threading
+import time
+
+try:
+    import instrumentation
+except ModuleNotFoundError:  # For tests
+    from .. import instrumentation
+
+logger = logging.getLogger()
+
+# Below this many remaining requests concurrency shrinks proportionally (down to 1)
+LOW_BUDGET = int(os.environ.get("GITHUB_LOW_BUDGET", 500))
+# Longest we wait for GitHub (Retry-After or budget reset), Lambda timeouts are short
+MAX_WAIT = float(os.environ.get("GITHUB_MAX_RATE_LIMIT_WAIT", 5))
+RATE_LIMITED_STATUSES = (403, 429)
+
+
+def _get_int(headers, name):
+    try:
+        return int(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Schedules requests sharing a GitHub token according to its budget,
+    as told by X-RateLimit-* headers of every response (per resource,
+    e.g. "core" or "graphql").
+
+    Requests run at most max_concurrency at a time, fewer as the budget gets
+    low, and wait for the reset once it's exhausted. Rate limited responses
+    tell how long to wait before retrying (see get_retry_delay).
+    """
+
+    def __init__(self, max_concurrency, low_budget=LOW_BUDGET, max_wait=MAX_WAIT):
+        self.max_concurrency = max_concurrency
+        self.low_budget = low_budget
+        self.max_wait = max_wait
+        # resource -> {"limit", "remaining", "reset"}
+        self.budgets = {}
+        self.in_flight = 0
+        self.waits = 0
+        self._condition = threading.Condition()
+
+    def get_concurrency(self, resource="core"):
+        budget = self.budgets.get(resource)
+        if not budget or budget["remaining"] >= self.low_budget:
+            return self.max_concurrency
+
+        allowed = self.max_concurrency * budget["remaining"] // self.low_budget
+        return max(1, allowed)
+
+    def _get_reset_wait(self, resource):
+        budget = self.budgets.get(resource)
+        if not budget or budget["remaining"] > 0:
+            return 0
+
+        return max(0, budget["reset"] - time.time())
+
+    def wait(self, seconds):
+        """
+        Sleeps up to max_wait, returns whether it waited for all of it
+        """
+        if seconds > self.max_wait:
+            logger.error(
+                f"GitHub asked to wait {seconds:.1f}s, "
+                f"more than {self.max_wait}s allowed"
+            )
+            return False
+
+        self.waits += 1
+        print(f"Waiting {seconds:.1f}s for GitHub rate limit")
+        start = time.perf_counter()
+        time.sleep(seconds)
+        instrumentation.record("github.throttle", time.perf_counter() - start)
+        return True
+
+    def acquire(self, resource="core"):
+        with self._condition:
+            while self.in_flight >= self.get_concurrency(resource):
+                self._condition.wait()
+            self.in_flight += 1
+
+        # Budget exhausted, requests would be refused until reset
+        reset_wait = self._get_reset_wait(resource)
+        if reset_wait:
+            self.wait(reset_wait)
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def update(self, headers):
+        limit = _get_int(headers, "X-RateLimit-Limit")
+        remaining = _get_int(headers, "X-RateLimit-Remaining")
+        reset = _get_int(headers, "X-RateLimit-Reset")
+        if limit is None or remaining is None or reset is None:
+            return
+
+        resource = headers.get("X-RateLimit-Resource") or "core"
+        with self._condition:
+            self.budgets[resource] = {
+                "limit": limit,
+                "remaining": remaining,
+                "reset": reset,
+            }
+            # Budget may have been renewed, let waiting requests check again
+            self._condition.notify_all()
+
+        instrumentation.set_gauge(f"github.{resource}.remaining", remaining)
+
+    def get_retry_delay(self, response):
+        """
+        Seconds to wait before retrying a rate limited response (primary or
+        secondary limits), or None when it shouldn't be retried.
+        """
+        if response.status_code not in RATE_LIMITED_STATUSES:
+            return None
+
+        retry_after = _get_int(response.headers, "Retry-After")
+        if retry_after is not None:
+            return retry_after
+
+        if _get_int(response.headers, "X-RateLimit-Remaining") == 0:
+            reset = _get_int(response.headers, "X-RateLimit-Reset") or time.time()
+            return max(0, reset - time.time())
+
+        # e.g. lack of permissions
+        return None
+
+    def get_metrics(self):
+        return {
+            "budgets": dict(self.budgets),
+            "in_flight": self.in_flight,
+            "concurrency": self.get_concurrency(),
+            "waits": self.waits,
+        }
@@ -0,0 +1,22 @@
+import logging
+
+logger = logging.getLogger()
+
+TIMEOUT = 5
+
+
+def post_response(response_url, payload):
+    """
+    Sends a delayed response to a slash command through its response_url.
+    """
+    # Only deferred CodeFreeze commands reply this way, no need to import it earlier
+    import requests
+
+    response = requests.post(response_url, json=payload, timeout=TIMEOUT)
+
+    if not response.ok:
+        logger.error(
+            f"Unable to reply to Slack ({response.status_code}): {response.text}"
+        )
+
+    return response
@@ -1,5 +1,10 @@
 import os
 
+try:
+    import instrumentation
+except ModuleNotFoundError:  # For tests
+    from .. import instrumentation
+
 STANDARD_SUMMARY = """
 ## Guidelines Report
 
@@ -54,7 +59,7 @@ QUALITY_REPORT = """
 #FOOTER#
 """
 
-QUALITY_REPORT_FOOTER = "See details in the [**quality report**](#QUALITY_LINK#)."
+QUALITY_REPORT_FOOTER = "See details in the [**#TOOL#quality report**](#QUALITY_LINK#)."
 
 
 def truncate_string(string, width):
@@ -82,6 +87,7 @@ def _create_summary_report(template, report, resume, footer):
     return summary.strip()
 
 
+@instrumentation.timed("render")
 def create_coverage_summary(report, footer):
     if report:
         covered = "+ Covered lines"
@@ -103,6 +109,7 @@ def create_coverage_footer(link):
     return COV_REPORT_FOOTER.replace("#COV_LINK#", link)
 
 
+@instrumentation.timed("render")
 def create_quality_summary(report, footer):
     if report:
         total = "+ Total lines"
@@ -120,10 +127,15 @@ def create_quality_summary(report, footer):
     return ""
 
 
-def create_quality_footer(link):
-    return QUALITY_REPORT_FOOTER.replace("#QUALITY_LINK#", link)
+def create_quality_footer(link, tool=""):
+    """
+    Tool is only named when there are reports from many tools
+    """
+    footer = QUALITY_REPORT_FOOTER.replace("#TOOL#", f"{tool} " if tool else "")
+    return footer.replace("#QUALITY_LINK#", link)
 
 
+@instrumentation.timed("render")
 def create_standard_summary(report, resume):
     content = []
 
@@ -1,10 +1,8 @@
 from src import quality_summary
 
 
-def test_flake8_read_quality_file(mocker, flake8_qualitydiff_content):
-    mocker.patch.object(quality_summary.s3, "get_quality_file", return_value=flake8_qualitydiff_content)
-
-    report = quality_summary._read_quality_file("")
+def test_flake8_parse_quality_file(flake8_qualitydiff_content):
+    report = quality_summary._parse_quality_content(flake8_qualitydiff_content)
 
     # Issues
     assert len(report["issues"]) == 7
@@ -31,29 +29,27 @@ def test_flake8_read_quality_file(mocker, flake8_qualitydiff_content):
     assert report["quality"] == "99%"
 
 
-def test_flake8_read_quality_file_single_line(mocker, flake8_qualitydiffsingle_content):
-    mocker.patch.object(quality_summary.s3, "get_quality_file", return_value=flake8_qualitydiffsingle_content)
-
-    report, tool = quality_summary._read_quality_file("")
+def test_flake8_parse_quality_file_single_line(flake8_qualitydiffsingle_content):
+    report, tool = quality_summary._parse_quality_content(
+        flake8_qualitydiffsingle_content
+    )
 
     assert report["total"] == "1"
     assert report["violations"] == "1"
     assert tool == "flake8"
 
 
-def test_flake8_read_quality_empty_file(mocker, flake8_qualitydiff_empty_content):
-    mocker.patch.object(quality_summary.s3, "get_quality_file", return_value=flake8_qualitydiff_empty_content)
-
-    report, tool = quality_summary._read_quality_file("")
+def test_flake8_parse_quality_empty_file(flake8_qualitydiff_empty_content):
+    report, tool = quality_summary._parse_quality_content(
+        flake8_qualitydiff_empty_content
+    )
 
     assert report is False
     assert tool == "flake8"
 
 
-def test_flake8_read_quality_file(mocker, flake8_qualitydiff_content):
-    mocker.patch.object(quality_summary.s3, "get_quality_file", return_value=flake8_qualitydiff_content)
-
-    report, tool = quality_summary._read_quality_file("")
+def test_flake8_parse_quality_file(flake8_qualitydiff_content):
+    report, tool = quality_summary._parse_quality_content(flake8_qualitydiff_content)
 
     # Issues
     assert len(report["issues"]) == 7
@@ -81,10 +77,8 @@ def test_flake8_read_quality_file(mocker, flake8_qualitydiff_content):
     assert tool == "flake8"
 
 
-def test_eslint_read_quality_file(mocker, eslint_qualitydiff_content):
-    mocker.patch.object(quality_summary.s3, "get_quality_file", return_value=eslint_qualitydiff_content)
-
-    report, tool = quality_summary._read_quality_file("")
+def test_eslint_parse_quality_file(eslint_qualitydiff_content):
+    report, tool = quality_summary._parse_quality_content(eslint_qualitydiff_content)
 
     # Issues
     assert len(report["issues"]) == 3
@@ -0,0 +1,107 @@
+import json
+
+from src import cache
+
+
+def test_local_cache_hits_and_misses():
+    local = cache.LocalCache()
+    local.set("key", "value")
+
+    assert local.get("key") == "value"
+    assert local.get("other", "default") == "default"
+    assert local.hits == 1
+    assert local.misses == 1
+
+
+def test_local_cache_evicts_least_recently_used():
+    local = cache.LocalCache(maxsize=2)
+    local.set("a", 1)
+    local.set("b", 2)
+    local.get("a")
+    local.set("c", 3)
+
+    assert local.get("a") == 1
+    assert local.get("b") is None
+    assert local.get("c") == 3
+
+
+def test_local_cache_expires(mocker):
+    local = cache.LocalCache(ttl=10)
+    monotonic = mocker.patch.object(cache.time, "monotonic", return_value=100)
+    local.set("key", "value")
+
+    monotonic.return_value = 105
+    assert local.get("key") == "value"
+
+    monotonic.return_value = 111
+    assert local.get("key") is None
+
+
+def test_tiered_cache_without_table_is_local_only(mocker):
+    mocker.patch.object(cache.dynamodb, "CACHE_TABLE", "")
+    get_mock = mocker.patch.object(cache.dynamodb, "get_cached_item")
+    put_mock = mocker.patch.object(cache.dynamodb, "put_cached_item")
+    tiered = cache.TieredCache("ns")
+
+    tiered.set("key", "value")
+
+    assert tiered.get("key") == "value"
+    assert tiered.get("missing") is None
+    assert get_mock.called is False
+    assert put_mock.called is False
+
+
+def test_tiered_cache_reads_through_persistent_tier(mocker):
+    mocker.patch.object(cache.dynamodb, "CACHE_TABLE", "Cache")
+    get_mock = mocker.patch.object(
+        cache.dynamodb, "get_cached_item", return_value={"Value": json.dumps([1])}
+    )
+    tiered = cache.TieredCache("ns")
+
+    assert tiered.get("key") == [1]
+    assert tiered.get("key") == [1]
+    get_mock.assert_called_once_with("ns:key")
+
+
+def test_tiered_cache_writes_through_persistent_tier(mocker):
+    mocker.patch.object(cache.dynamodb, "CACHE_TABLE", "Cache")
+    put_mock = mocker.patch.object(cache.dynamodb, "put_cached_item")
+    tiered = cache.TieredCache("ns", ttl=60)
+
+    tiered.set("key", {"a": 1})
+
+    put_mock.assert_called_once_with("ns:key", 60, Value='{"a": 1}')
+
+
+def test_tiered_cache_ignores_persistent_failures(mocker):
+    mocker.patch.object(cache.dynamodb, "CACHE_TABLE", "Cache")
+    mocker.patch.object(cache.dynamodb, "get_cached_item", side_effect=Exception)
+    tiered = cache.TieredCache("ns")
+
+    assert tiered.get("key", "default") == "default"
+
+
+def test_tiered_cache_can_be_local_only(mocker):
+    mocker.patch.object(cache.dynamodb, "CACHE_TABLE", "Cache")
+    get_mock = mocker.patch.object(cache.dynamodb, "get_cached_item")
+    put_mock = mocker.patch.object(cache.dynamodb, "put_cached_item")
+    tiered = cache.TieredCache("ns", persistent=False)
+
+    tiered.set("key", "value")
+
+    assert tiered.get("key") == "value"
+    assert tiered.get("missing") is None
+    assert get_mock.called is False
+    assert put_mock.called is False
+
+
+def test_tiered_cache_keeps_big_values_local(mocker):
+    mocker.patch.object(cache.dynamodb, "CACHE_TABLE", "Cache")
+    put_mock = mocker.patch.object(cache.dynamodb, "put_cached_item")
+    tiered = cache.TieredCache("ns", max_persistent_size=10)
+
+    tiered.set("small", "value")
+    tiered.set("big", "value" * 10)
+
+    assert tiered.get("big") == "value" * 10
+    put_mock.assert_called_once_with("ns:small", None, Value='"value"')
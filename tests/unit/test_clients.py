@@ -0,0 +1,72 @@
+import io
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.aws import clients, s3
+
+
+@pytest.fixture(autouse=True)
+def empty_registry():
+    clients.reset()
+    yield
+    clients.reset()
+
+
+def test_get_client_is_created_once(mocker):
+    client_mock = mocker.patch("boto3.client", return_value=MagicMock())
+
+    first = clients.get_client("s3")
+    second = clients.get_client("s3")
+
+    assert first is second
+    client_mock.assert_called_once()
+
+
+def test_get_resource_is_created_once(mocker):
+    resource_mock = mocker.patch("boto3.resource", return_value=MagicMock())
+
+    assert clients.get_resource("dynamodb") is clients.get_resource("dynamodb")
+    resource_mock.assert_called_once()
+
+
+def test_client_config(mocker):
+    mocker.patch.object(clients, "MAX_POOL_CONNECTIONS", 20)
+    mocker.patch.object(clients, "RETRY_MODE", "standard")
+
+    config = clients._get_config()
+
+    assert config.max_pool_connections == 20
+    assert config.retries == {"max_attempts": clients.MAX_ATTEMPTS, "mode": "standard"}
+
+
+def test_registered_stand_in_is_used(mocker):
+    body = io.BytesIO(b"line 1\nline 2\n")
+    stand_in = MagicMock(**{"get_object.return_value": {"Body": body}})
+    client_mock = mocker.patch("boto3.client")
+
+    clients.register("s3", client=stand_in)
+
+    assert list(s3.stream_coverage_file("hash")) == ["line 1\n", "line 2\n"]
+    assert client_mock.called is False
+    stand_in.get_object.assert_called_once_with(
+        Bucket=s3.BUCKET_NAME, Key="coverage/hash"
+    )
+
+
+def test_read_lines_closes_body_when_stopped_early():
+    body = io.BytesIO(b"line 1\nline 2\n")
+    lines = s3.read_lines(body)
+
+    assert next(lines) == "line 1\n"
+    lines.close()
+
+    assert body.closed
+
+
+def test_read_lines_from_chunked_body():
+    chunks = iter([b"line 1", "ação".encode()])
+    body = MagicMock(**{"iter_lines.return_value": chunks})
+
+    assert list(s3.read_lines(body)) == ["line 1", "ação"]
+    body.close.assert_called_once()
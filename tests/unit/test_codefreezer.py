@@ -1,6 +1,39 @@
 import os
+from unittest.mock import MagicMock
+
+import pytest
 
 from src import codefreezer
+from src.cache import LocalCache
+
+
+@pytest.fixture(autouse=True)
+def empty_caches(mocker):
+    mocker.patch.object(codefreezer, "freeze_config_cache", LocalCache(maxsize=1))
+
+
+@pytest.fixture(autouse=True)
+def rest_listing(mocker):
+    """
+    Open PRs are listed through github.get_open_prs unless a test enables GraphQL
+    """
+    mocker.patch.object(codefreezer, "FREEZE_GRAPHQL", False)
+
+
+@pytest.fixture()
+def async_queue(mocker):
+    """
+    Local stand-in for async lambda invocations, payloads are queued
+    instead of being sent to AWS.
+    """
+    queue = []
+    mocker.patch.object(codefreezer, "ASYNC_FREEZE", True)
+    mocker.patch.object(
+        codefreezer.awslambda,
+        "invoke_async",
+        side_effect=lambda name, payload: queue.append((name, payload)),
+    )
+    return queue
 
 
 def assert_status_response(response, status, emoji, author):
@@ -70,7 +103,7 @@ def test_enable_freeze(mocker):
         codefreezer.github, "get_open_prs", return_value=prs
     )
     update_pr_mock = mocker.patch.object(
-        codefreezer.github, "update_pr_status", return_value=True
+        codefreezer.github, "update_pr_status", return_value=MagicMock(ok=True)
     )
     write_db_mock = mocker.patch.object(
         codefreezer.dynamodb, "write_config", return_value=None
@@ -96,7 +129,7 @@ def test_disable_freeze(mocker):
         codefreezer.github, "get_open_prs", return_value=prs
     )
     update_pr_mock = mocker.patch.object(
-        codefreezer.github, "update_pr_status", return_value=True
+        codefreezer.github, "update_pr_status", return_value=MagicMock(ok=True)
     )
     write_db_mock = mocker.patch.object(
         codefreezer.dynamodb, "write_config", return_value=None
@@ -110,6 +143,34 @@ def test_disable_freeze(mocker):
     )
 
 
+def test_freeze_reports_counts(mocker):
+    prs = [{"statuses_url": "ok_url"}, {"statuses_url": "bad_url"}]
+
+    mocker.patch.dict(os.environ, {"REPOS": "owner/repo1,owner/repo2"})
+    mocker.patch.object(codefreezer, "_has_authorization", return_value=True)
+    mocker.patch.object(codefreezer.dynamodb, "write_config", return_value=None)
+
+    def _get_open_prs(repo):
+        if repo == "owner/repo2":
+            raise Exception("Boom")
+        return prs
+
+    def _update_pr_status(url, *args):
+        return MagicMock(ok=url == "ok_url", text="error")
+
+    mocker.patch.object(codefreezer.github, "get_open_prs", side_effect=_get_open_prs)
+    update_pr_mock = mocker.patch.object(
+        codefreezer.github, "update_pr_status", side_effect=_update_pr_status
+    )
+
+    response = codefreezer._freeze({"text": "enable", "user_name": "guilherme"})
+    details = response["attachments"][0]["text"]
+
+    assert update_pr_mock.call_count == 2
+    assert "1 PRs updated, 1 failed" in details
+    assert "owner/repo2" in details
+
+
 def test_handler_calls_freeze(event_creator, incoming_slack_command, mocker):
     freeze_mock = mocker.patch.object(codefreezer, "_freeze", return_value=None)
     event = event_creator(incoming_slack_command)
@@ -144,3 +205,125 @@ def test_handler_calls_status(event_creator, incoming_slack_command, mocker):
     status_mock.assert_called_once()
     assert response["statusCode"] == 200
     assert "ok" in response["body"]
+
+
+def test_async_handler_acks_and_defers_freeze(
+    event_creator, incoming_slack_command, async_queue, mocker
+):
+    mocker.patch.object(codefreezer, "_has_authorization", return_value=True)
+    freeze_mock = mocker.patch.object(codefreezer, "_freeze", return_value={})
+    event = event_creator(incoming_slack_command)
+
+    response = codefreezer.slack_handler(event, MagicMock(function_name="codefreeze"))
+
+    assert response["statusCode"] == 200
+    assert "Working on it" in response["body"]
+    assert freeze_mock.called is False
+
+    name, payload = async_queue.pop()
+    assert name == "codefreeze"
+    assert payload["deferred_command"] == codefreezer._extract_command(
+        incoming_slack_command
+    )
+
+
+def test_async_worker_replies_to_response_url(
+    event_creator, incoming_slack_command, async_queue, mocker
+):
+    mocker.patch.object(codefreezer, "_has_authorization", return_value=True)
+    freeze_mock = mocker.patch.object(
+        codefreezer, "_freeze", return_value={"text": "done"}
+    )
+    post_mock = mocker.patch.object(codefreezer.slack, "post_response")
+    event = event_creator(incoming_slack_command)
+
+    codefreezer.slack_handler(event, MagicMock(function_name="codefreeze"))
+    _, payload = async_queue.pop()
+    response = codefreezer.slack_handler(payload, None)
+
+    command = payload["deferred_command"]
+    freeze_mock.assert_called_once_with(command)
+    post_mock.assert_called_once_with(command["response_url"], {"text": "done"})
+    assert response["statusCode"] == 200
+
+
+def test_async_handler_unauthorized_is_not_deferred(
+    event_creator, incoming_slack_command, async_queue, mocker
+):
+    mocker.patch.object(codefreezer, "_has_authorization", return_value=False)
+    event = event_creator(incoming_slack_command)
+
+    response = codefreezer.slack_handler(event, MagicMock(function_name="codefreeze"))
+
+    assert codefreezer.UNAUTHORIZED_MESSAGE in response["body"]
+    assert async_queue == []
+
+
+def test_freeze_config_is_cached_until_written(mocker):
+    get_config_mock = mocker.patch.object(
+        codefreezer.dynamodb,
+        "get_code_freeze_config",
+        return_value={"Status": "disabled", "Author": "author"},
+    )
+    mocker.patch.object(codefreezer.dynamodb, "write_config")
+
+    codefreezer._get_freeze_config()
+    codefreezer._get_freeze_config()
+    assert get_config_mock.call_count == 1
+
+    codefreezer._write_freeze_config(Status="enabled", Author="author")
+    codefreezer._get_freeze_config()
+    assert get_config_mock.call_count == 2
+
+
+def test_freeze_skips_unchanged_statuses(mocker):
+    prs = [{"statuses_url": "frozen_url"}, {"statuses_url": "url"}]
+
+    mocker.patch.dict(os.environ, {"REPOS": "owner/repo1"})
+    mocker.patch.object(codefreezer, "_has_authorization", return_value=True)
+    mocker.patch.object(codefreezer.dynamodb, "write_config", return_value=None)
+    mocker.patch.object(codefreezer.github, "SKIP_UNCHANGED_STATUSES", True)
+    mocker.patch.object(codefreezer.github, "get_open_prs", return_value=prs)
+    mocker.patch.object(
+        codefreezer.github,
+        "filter_unchanged_statuses",
+        side_effect=lambda url, checks: [] if url == "frozen_url" else checks,
+    )
+    update_pr_mock = mocker.patch.object(
+        codefreezer.github, "update_pr_status", return_value=MagicMock(ok=True)
+    )
+
+    response = codefreezer._freeze({"text": "enable", "user_name": "guilherme"})
+    details = response["attachments"][0]["text"]
+
+    update_pr_mock.assert_called_once()
+    assert "1 PRs updated, 1 unchanged, 0 failed" in details
+
+
+def test_list_open_prs_through_graphql(mocker):
+    mocker.patch.object(codefreezer, "FREEZE_GRAPHQL", True)
+    prs = [{"statuses_url": "url"}]
+    mocker.patch.object(
+        codefreezer.github, "get_open_pr_heads", return_value=(prs, ["owner/gone"])
+    )
+    rest_mock = mocker.patch.object(codefreezer.github, "get_open_prs")
+
+    result = codefreezer._list_open_prs(["owner/repo", "owner/gone"])
+
+    assert result == (prs, ["owner/gone"])
+    rest_mock.assert_not_called()
+
+
+def test_list_open_prs_falls_back_to_rest(mocker):
+    mocker.patch.object(codefreezer, "FREEZE_GRAPHQL", True)
+    mocker.patch.object(
+        codefreezer.github, "get_open_pr_heads", side_effect=Exception("Boom")
+    )
+    mocker.patch.object(
+        codefreezer.github, "get_open_prs", return_value=[{"statuses_url": "url"}]
+    )
+
+    prs, failed_repos = codefreezer._list_open_prs(["owner/repo"])
+
+    assert prs == [{"statuses_url": "url"}]
+    assert failed_repos == []
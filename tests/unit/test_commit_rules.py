@@ -0,0 +1,87 @@
+import pytest
+
+from src import commit_rules
+from src.cache import LocalCache
+
+PATTERNS = [r"^(?P<ticket>\w+\-\d+)", r"^NO-TICKET", r"Release \d{8}"]
+
+
+@pytest.fixture(autouse=True)
+def empty_caches(mocker):
+    mocker.patch.object(commit_rules, "_config_cache", LocalCache(maxsize=1))
+    mocker.patch.object(commit_rules, "_rule_sets", LocalCache())
+
+
+def test_rule_set_reports_first_matching_pattern():
+    rules = commit_rules.RuleSet(PATTERNS)
+
+    assert rules._matcher is not None
+    assert rules.match("FY-1234 Do work") == PATTERNS[0]
+    assert rules.match("NO-TICKET Release 20190822") == PATTERNS[1]
+    assert rules.match("Release 20190822") == PATTERNS[2]
+    assert rules.match("Improved scripts") is None
+
+
+def test_rules_are_compiled_once():
+    rules = commit_rules.compile_rules(PATTERNS)
+    assert rules is commit_rules.compile_rules(list(PATTERNS))
+
+
+def test_get_rules_per_repo(mocker):
+    mocker.patch.object(commit_rules, "COMMIT_RULES_KEY", "config/rules.json")
+    get_file_mock = mocker.patch.object(
+        commit_rules.s3,
+        "get_json_file",
+        return_value={"default": ["^NO-TICKET"], "owner/repo": ["^JIRA-"]},
+    )
+
+    assert commit_rules.get_rules("owner/repo", PATTERNS).patterns == ["^JIRA-"]
+    assert commit_rules.get_rules("owner/other", PATTERNS).patterns == ["^NO-TICKET"]
+    get_file_mock.assert_called_once_with("config/rules.json")
+
+
+def test_get_rules_falls_back_to_defaults(mocker):
+    mocker.patch.object(commit_rules, "COMMIT_RULES_KEY", "config/rules.json")
+    mocker.patch.object(commit_rules.s3, "get_json_file", side_effect=Exception("Boom"))
+
+    assert commit_rules.get_rules("owner/repo", PATTERNS).patterns == PATTERNS
+
+
+def test_rule_set_matches_patterns_with_inline_flags():
+    patterns = [r"^JIRA-\d+", r"(?i)^no-ticket"]
+    rules = commit_rules.RuleSet(patterns)
+
+    assert rules.match("NO-TICKET Fix typo") == patterns[1]
+    assert rules.match("jira-1 Fix typo") is None
+
+
+def test_rule_set_matches_patterns_with_backreferences():
+    patterns = [r"^(\w+):", r"^(\w+)-\1"]
+    rules = commit_rules.RuleSet(patterns)
+
+    assert rules.match("abc-abc Do work") == patterns[1]
+    assert rules.match("abc-def Do work") is None
+    assert rules.match("fix: Do work") == patterns[0]
+
+
+def test_rule_set_matches_patterns_with_same_group_names():
+    patterns = [r"^(?P<ticket>JIRA-\d+)", r"^(?P<ticket>FY-\d+)"]
+    rules = commit_rules.RuleSet(patterns)
+
+    assert rules.match("FY-12 Do work") == patterns[1]
+
+
+def test_rule_set_skips_invalid_patterns():
+    rules = commit_rules.RuleSet(["(", r"^NO-TICKET"])
+
+    assert rules.patterns == [r"^NO-TICKET"]
+    assert rules.match("NO-TICKET Do work") == r"^NO-TICKET"
+
+
+def test_get_rules_falls_back_to_defaults_without_valid_patterns(mocker):
+    mocker.patch.object(commit_rules, "COMMIT_RULES_KEY", "config/rules.json")
+    mocker.patch.object(
+        commit_rules.s3, "get_json_file", return_value={"default": ["("]}
+    )
+
+    assert commit_rules.get_rules("owner/repo", PATTERNS).patterns == PATTERNS
@@ -0,0 +1,26 @@
+from src import concurrency
+
+
+def test_fan_out_keeps_order():
+    outcomes = concurrency.fan_out(lambda item: item * 2, [1, 2, 3], max_workers=2)
+
+    assert [outcome.item for outcome in outcomes] == [1, 2, 3]
+    assert [outcome.result for outcome in outcomes] == [2, 4, 6]
+    assert all(outcome.ok for outcome in outcomes)
+
+
+def test_fan_out_captures_errors():
+    def _process(item):
+        if item == 2:
+            raise ValueError("Boom")
+        return item
+
+    outcomes = concurrency.fan_out(_process, [1, 2, 3])
+
+    assert [outcome.ok for outcome in outcomes] == [True, False, True]
+    assert isinstance(outcomes[1].error, ValueError)
+    assert outcomes[1].result is None
+
+
+def test_fan_out_no_items():
+    assert concurrency.fan_out(lambda item: item, []) == []
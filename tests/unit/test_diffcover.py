@@ -0,0 +1,80 @@
+import io
+
+from src.qualitytools import diffcover
+from src.qualitytools.base import FILE_PATTERN
+from src.qualitytools.factory import create_quality_adapter
+
+
+def test_parse_footer_line():
+    assert diffcover.parse_footer_line("Total:   589 lines") == ("Total", "589")
+    assert diffcover.parse_footer_line("Missing: 1 line") == ("Missing", "1")
+    assert diffcover.parse_footer_line("% Quality: 99%") == ("% Quality", "99%")
+
+
+def test_reader_sections(flake8_qualitydiff_content):
+    reader = diffcover.DiffCoverReader(flake8_qualitydiff_content)
+
+    header = reader.read_header()
+    sections = list(reader)
+
+    assert header == [
+        "Diff Quality",
+        "Quality Report: flake8",
+        "Diff: origin/dev...HEAD, staged and unstaged changes",
+    ]
+    assert reader.get_header_field("Quality Report") == "flake8"
+    assert reader.get_target_branch() == "origin/dev"
+    assert sections[0] == (
+        diffcover.BODY, "example/workers/feedback/models.py (80.0%):"
+    )
+    assert sections[-1] == (diffcover.FOOTER, "% Quality: 99%")
+    assert reader.section == diffcover.END
+
+
+def test_reader_reads_header_lazily(flake8_qualitydiff_content):
+    stream = io.StringIO(flake8_qualitydiff_content)
+    reader = diffcover.DiffCoverReader(stream)
+
+    reader.read_header()
+    first_body_line = stream.readline()
+
+    # Only header (and the first body line) were consumed
+    assert first_body_line.startswith("example/workers/feedback/models.py:3: F401")
+
+
+def test_reader_missing_content():
+    reader = diffcover.DiffCoverReader(False)
+
+    assert reader.read_header() == []
+    assert list(reader) == []
+
+
+def test_adapter_reads_stream(flake8_qualitydiff_content):
+    adapter, tool = create_quality_adapter(io.StringIO(flake8_qualitydiff_content))
+    report = adapter.generate_report()
+
+    assert tool == "flake8"
+    assert len(report["issues"]) == 7
+    assert len(report["files"]) == 13
+    assert report["violations"] == "5"
+
+
+def test_flake8_issue_with_parentheses_is_not_a_file(flake8_qualitydiff_content):
+    content = flake8_qualitydiff_content.replace(
+        "E999 SyntaxError: invalid syntax", "E999 SyntaxError: invalid syntax (x.py)"
+    )
+    adapter, _ = create_quality_adapter(content)
+    report = adapter.generate_report()
+
+    assert len(report["files"]) == 13
+    assert report["issues"][2]["description"] == "SyntaxError: invalid syntax (x.py)"
+
+
+def test_file_pattern_accepts_parentheses_in_path():
+    match = FILE_PATTERN.match("app/(auth)/page.js (50.0%):")
+
+    assert match.groupdict() == {"file": "app/(auth)/page.js", "value": "50.0%"}
+
+
+def test_file_pattern_rejects_issue_lines():
+    assert FILE_PATTERN.match("app/page.js:3: F401 'x' imported (see docs)") is None
@@ -16,6 +16,15 @@ def test_get_reports_link(mocker, ci_artifacts_payload):
     check_report_url(reports, "coverage", "coverage.html")
 
 
+def test_get_reports_link_many_tools():
+    dto = CircleCommitDTO("", "", "", "", "flake8,mypy", "")
+    reports = dto.get_reports_links()
+
+    assert dto.quality_tools == ["flake8", "mypy"]
+    assert len(reports.keys()) == 4
+    check_report_url(reports, "mypy", "mypy.html")
+
+
 def test_extract_pr_data():
     dto = CircleCommitDTO("", "", "", "", "", "", pr_link="https://github.com/owner-here/project-here/pull/200")
     results = dto._extract_pr_data()
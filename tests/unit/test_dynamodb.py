@@ -1,8 +1,17 @@
 from unittest.mock import MagicMock
 
+import pytest
+
 from src.aws import dynamodb
 
 
+@pytest.fixture()
+def table_mock(mocker):
+    table = MagicMock()
+    mocker.patch.object(dynamodb, "_get_table", return_value=table)
+    return table
+
+
 def test_get_empty_code_freeze_config(mocker):
     table_mock = MagicMock(get_item=MagicMock(return_value={}))
     mocker.patch.object(dynamodb, "_get_table", return_value=table_mock)
@@ -12,3 +21,131 @@ def test_get_empty_code_freeze_config(mocker):
     assert "ConfigName" in response
     assert "Status" in response
     assert "Author" in response
+
+
+def test_get_expired_cached_item(mocker):
+    item = {"CacheKey": "key", "ExpiresAt": 100}
+    table_mock = MagicMock(get_item=MagicMock(return_value={"Item": item}))
+    mocker.patch.object(dynamodb, "_get_table", return_value=table_mock)
+    mocker.patch.object(dynamodb.time, "time", return_value=200)
+
+    assert dynamodb.get_cached_item("key") is False
+
+
+def test_get_cached_item_without_expiration(mocker):
+    item = {"CacheKey": "key", "Value": "value"}
+    table_mock = MagicMock(get_item=MagicMock(return_value={"Item": item}))
+    mocker.patch.object(dynamodb, "_get_table", return_value=table_mock)
+
+    assert dynamodb.get_cached_item("key") == item
+
+
+def test_save_reports_inline(table_mock, mocker):
+    save_file_mock = mocker.patch.object(dynamodb.s3, "save_reports_file")
+
+    dynamodb.save_reports(
+        {"coverage": "15%"},
+        False,
+        "flake8",
+        commit_sha="sha",
+        owner="owner",
+        pr_link="link",
+    )
+
+    item = table_mock.put_item.call_args[1]["Item"]
+    assert item["commit_sha"] == "sha"
+    assert item["owner"] == "owner"
+    assert item["coverage"] == "15%"
+    assert item["quality"] is False
+    assert "pr_link" not in item
+    assert "cov_report" not in item
+    reports = dynamodb.report_codec.decode(item["reports"])
+    assert reports["cov_report"] == {"coverage": "15%"}
+    assert save_file_mock.called is False
+
+
+def test_save_big_reports_to_s3(table_mock, mocker):
+    mocker.patch.object(dynamodb, "MAX_INLINE_REPORTS_SIZE", 1)
+    save_file_mock = mocker.patch.object(dynamodb.s3, "save_reports_file")
+
+    dynamodb.save_reports({"coverage": "15%"}, False, "flake8", commit_sha="sha")
+
+    item = table_mock.put_item.call_args[1]["Item"]
+    assert item["reports_key"] == "sha"
+    assert "reports" not in item
+    save_file_mock.assert_called_once()
+
+
+def test_get_report_decodes_reports(table_mock, mocker):
+    reports = {"cov_report": {"coverage": "15%"}, "quality_report": False}
+    item = {
+        "commit_sha": "sha",
+        "schema_version": 1,
+        "reports": dynamodb.report_codec.encode(reports),
+    }
+    table_mock.get_item.return_value = {"Item": item}
+
+    report = dynamodb.get_report("sha")
+
+    assert report == {"commit_sha": "sha", "schema_version": 1, **reports}
+
+
+def test_get_report_from_s3(table_mock, mocker):
+    reports = {"cov_report": False, "quality_report": {"quality": "99%"}}
+    item = {"commit_sha": "sha", "schema_version": 1, "reports_key": "sha"}
+    table_mock.get_item.return_value = {"Item": item}
+    get_file_mock = mocker.patch.object(
+        dynamodb.s3,
+        "get_reports_file",
+        return_value=dynamodb.report_codec.encode(reports),
+    )
+
+    report = dynamodb.get_report("sha")
+
+    get_file_mock.assert_called_once_with("sha")
+    assert report["quality_report"] == {"quality": "99%"}
+
+
+def test_get_legacy_report_is_untouched(table_mock):
+    item = {"commit_sha": "sha", "cov_report": {"coverage": "15%"}}
+    table_mock.get_item.return_value = {"Item": item}
+
+    assert dynamodb.get_report("sha") == item
+
+
+def test_get_report_with_projection(table_mock, mocker):
+    decode_mock = mocker.patch.object(dynamodb.report_codec, "decode")
+    item = {"commit_sha": "sha", "coverage": "15%"}
+    table_mock.get_item.return_value = {"Item": item}
+
+    report = dynamodb.get_report("sha", ("commit_sha", "coverage"), consistent=True)
+
+    assert report == {"commit_sha": "sha", "coverage": "15%"}
+    table_mock.get_item.assert_called_once_with(
+        Key={"commit_sha": "sha"},
+        ConsistentRead=True,
+        ProjectionExpression="#f0, #f1",
+        ExpressionAttributeNames={"#f0": "commit_sha", "#f1": "coverage"},
+    )
+    decode_mock.assert_not_called()
+
+
+def test_get_report_with_projected_reports(table_mock, mocker):
+    decode_mock = mocker.patch.object(
+        dynamodb.report_codec, "decode", return_value={"cov_report": {}}
+    )
+    item = {"commit_sha": "sha", "reports": b"enc"}
+    table_mock.get_item.return_value = {"Item": item}
+
+    report = dynamodb.get_report("sha", ("commit_sha", "reports"))
+
+    assert report == {"commit_sha": "sha", "cov_report": {}}
+    decode_mock.assert_called_once_with(b"enc")
+    table_mock.get_item.assert_called_once_with(
+        Key={"commit_sha": "sha"},
+        ConsistentRead=False,
+        ProjectionExpression="#f0, #f1, #f2",
+        ExpressionAttributeNames={
+            "#f0": "commit_sha", "#f1": "reports", "#f2": "reports_key"
+        },
+    )
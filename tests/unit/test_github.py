@@ -4,6 +4,7 @@ from unittest.mock import MagicMock
 import pytest
 
 from src import quality_summary
+from src.cache import LocalCache
 from src.thirdparties import github
 
 
@@ -13,87 +14,190 @@ def expected_headers(mocker):
     return github._get_gh_headers()
 
 
+@pytest.fixture(autouse=True)
+def empty_caches(mocker):
+    mocker.patch.object(github.get_client(), "etag_cache", LocalCache())
+    mocker.patch.object(github, "comment_index", LocalCache())
+    mocker.patch.object(github, "repo_ids", LocalCache())
+
+
 @pytest.fixture()
-def cov_report(covdiff_content, mocker):
-    mocker.patch.object(
-        quality_summary.s3, "get_coverage_file", return_value=covdiff_content
+def session_request(mocker):
+    response = MagicMock(ok=True, links={}, **{"json.return_value": []})
+    return mocker.patch.object(
+        github.get_client().session, "request", return_value=response
     )
-    return quality_summary._read_coverage_file("")
 
 
 @pytest.fixture()
-def quality_report(flake8_qualitydiff_content, mocker):
-    mocker.patch.object(
-        quality_summary.s3, "get_quality_file", return_value=flake8_qualitydiff_content
+def comment_request(session_request):
+    session_request.return_value.json.return_value = {"url": "comment_url"}
+    return session_request
+
+
+def assert_requested(request_mock, method, url, **kwargs):
+    request_mock.assert_called_once_with(
+        method, url, headers=github._get_gh_headers(), timeout=github.TIMEOUT, **kwargs
     )
-    return quality_summary._read_quality_file("")
 
 
-def test_update_pr_status(expected_headers, mocker):
-    request = mocker.patch.object(github.requests, "post", return_value=None)
+@pytest.fixture()
+def cov_report(covdiff_content):
+    return quality_summary._parse_coverage_content(covdiff_content)
+
 
+@pytest.fixture()
+def quality_report(flake8_qualitydiff_content):
+    return quality_summary._parse_quality_content(flake8_qualitydiff_content)
+
+
+def test_update_pr_status(expected_headers, session_request):
     github.update_pr_status("url", "state", "context", "description", "target_url")
 
-    request.assert_called_once_with(
+    assert_requested(
+        session_request,
+        "POST",
         "url",
         json={"context": "context", "state": "state", "description": "description", "target_url": "target_url"},
-        headers=expected_headers,
     )
 
 
-def test_get_commits(expected_headers, mocker):
-    request = mocker.patch.object(github.requests, "get", return_value=MagicMock())
-
+def test_get_commits(expected_headers, session_request):
     github.get_commits("url")
 
-    request.assert_called_once_with("url", headers=expected_headers)
+    assert_requested(session_request, "GET", "url", params={"per_page": 100})
+
+
+def test_client_is_shared_across_calls():
+    assert github.get_client() is github.get_client()
+
+
+def test_client_mounts_pooled_adapter():
+    client = github.GitHubClient(pool_size=3, max_retries=2, backoff_factor=1)
+    adapter = client.session.get_adapter("https://api.github.com")
+
+    assert adapter._pool_maxsize == 3
+    assert adapter.max_retries.total == 2
+    assert adapter.max_retries.backoff_factor == 1
+
+
+def _page(items, next_url=None):
+    links = {"next": {"url": next_url}} if next_url else {}
+    return MagicMock(ok=True, links=links, **{"json.return_value": items})
+
+
+def test_page_iterator_follows_links(mocker):
+    request = mocker.patch.object(
+        github.get_client(),
+        "get",
+        side_effect=[_page([1, 2], "url?page=2"), _page([3])],
+    )
+    pages = github.PageIterator("url")
+
+    assert list(pages) == [1, 2, 3]
+    assert pages.pages == 2
+    assert request.call_args_list[1] == (("url?page=2",), {"params": None})
+
+
+def test_page_iterator_is_lazy(mocker):
+    request = mocker.patch.object(
+        github.get_client(),
+        "get",
+        side_effect=[_page([1, 2], "url?page=2"), _page([3])],
+    )
+    pages = github.PageIterator("url")
+
+    assert next(iter(pages)) == 1
+    assert request.call_count == 1
+    assert pages.pages == 1
+
+
+def test_page_iterator_raises_on_error(mocker):
+    mocker.patch.object(
+        github.get_client(), "get", return_value=MagicMock(ok=False, text="Not Found")
+    )
+
+    with pytest.raises(github.GitHubException):
+        list(github.PageIterator("url"))
+
+
+def test_get_comment_url_stops_on_first_match(mocker):
+    mocker.patch.dict(os.environ, {"GITHUB_USER": "bot"})
+    comment = {"body": "## Guidelines Report", "user": {"login": "bot"}, "url": "found"}
+    request = mocker.patch.object(
+        github.get_client(), "get", side_effect=[_page([comment], "url?page=2")]
+    )
+
+    assert github._get_comment_url("url", "Guidelines Report") == "found"
+    assert request.call_count == 1
+
+
+def test_get_caches_etag_and_replays_not_modified(expected_headers, mocker):
+    headers = {"ETag": '"abc"', "Link": '<url?page=2>; rel="next"'}
+    fresh = MagicMock(ok=True, status_code=200, headers=headers, text="[1]")
+    request = mocker.patch.object(
+        github.get_client().session,
+        "request",
+        side_effect=[fresh, MagicMock(ok=False, status_code=304)],
+    )
+
+    github.get_client().get("url", params={"per_page": 100})
+    response = github.get_client().get("url", params={"per_page": 100})
+
+    second_call_headers = request.call_args_list[1][1]["headers"]
+    assert second_call_headers["If-None-Match"] == '"abc"'
+    assert response.ok
+    assert response.json() == [1]
+    assert response.links["next"]["url"] == "url?page=2"
+
+
+def test_get_without_etag_is_not_cached(expected_headers, mocker):
+    response = MagicMock(ok=True, status_code=200, headers={}, text="[1]")
+    request = mocker.patch.object(
+        github.get_client().session, "request", return_value=response
+    )
 
+    github.get_client().get("url")
+    github.get_client().get("url")
 
-def test_create_standard_summary(expected_headers, mocker):
+    assert "If-None-Match" not in request.call_args_list[1][1]["headers"]
+
+
+def test_create_standard_summary(expected_headers, comment_request, mocker):
     mocker.patch.object(github, "_get_comment_url", return_value=False)
     mocker.patch.object(
         github.summary_factory, "create_standard_summary", return_value="content"
     )
-    post_mock = mocker.patch.object(github.requests, "post", return_value=MagicMock())
-    patch_mock = mocker.patch.object(github.requests, "patch", return_value=MagicMock())
 
     github.write_standard_summary("url", [], "resume")
 
-    assert patch_mock.called is False
-    post_mock.assert_called_once_with(
-        "url", json={"body": "content"}, headers=expected_headers
-    )
+    assert_requested(comment_request, "POST", "url", json={"body": "content"})
 
 
-def test_edit_standard_summary(expected_headers, mocker):
+def test_edit_standard_summary(expected_headers, comment_request, mocker):
     mocker.patch.object(github, "_get_comment_url", return_value="edit_url")
     mocker.patch.object(
         github.summary_factory, "create_standard_summary", return_value="content"
     )
-    post_mock = mocker.patch.object(github.requests, "post", return_value=MagicMock())
-    patch_mock = mocker.patch.object(github.requests, "patch", return_value=MagicMock())
 
     github.write_standard_summary("url", [], "resume")
 
-    assert post_mock.called is False
-    patch_mock.assert_called_once_with(
-        "edit_url", json={"body": "content"}, headers=expected_headers
-    )
+    assert_requested(comment_request, "PATCH", "edit_url", json={"body": "content"})
 
 
-def test_get_open_prs(expected_headers, mocker):
-    request = mocker.patch.object(github.requests, "get", return_value=MagicMock())
-
+def test_get_open_prs(expected_headers, session_request):
     github.get_open_prs("guilatrova/examplerepo")
 
-    request.assert_called_once_with(
-        "https://api.github.com/repos/guilatrova/examplerepo/pulls?state=open",
-        headers=expected_headers,
+    assert_requested(
+        session_request,
+        "GET",
+        "https://api.github.com/repos/guilatrova/examplerepo/pulls",
+        params={"per_page": 100, "state": "open"},
     )
 
 
 def test_write_quality_summary_create_both_reports(
-    mocker, cov_report, quality_report, expected_headers
+    mocker, cov_report, quality_report, expected_headers, comment_request
 ):
     mocker.patch.object(github, "_get_comment_url", return_value=False)
     mocker.patch.object(
@@ -102,17 +206,16 @@ def test_write_quality_summary_create_both_reports(
     mocker.patch.object(
         github.summary_factory, "create_quality_summary", return_value="quasummary"
     )
-    post_mock = mocker.patch.object(github.requests, "post", side_effect=None)
 
     github.write_quality_summary("url", cov_report, quality_report, None, None)
 
-    post_mock.assert_called_once_with(
-        "url", json={"body": "covsummary\nquasummary"}, headers=expected_headers
+    assert_requested(
+        comment_request, "POST", "url", json={"body": "covsummary\nquasummary"}
     )
 
 
 def test_write_quality_summary_update_both_reports(
-    expected_headers, cov_report, quality_report, mocker
+    expected_headers, cov_report, quality_report, comment_request, mocker
 ):
     mocker.patch.object(github, "_get_comment_url", return_value="edit_url")
     mocker.patch.object(
@@ -121,33 +224,220 @@ def test_write_quality_summary_update_both_reports(
     mocker.patch.object(
         github.summary_factory, "create_quality_summary", return_value="quasummary"
     )
-    patch_mock = mocker.patch.object(github.requests, "patch", side_effect=None)
 
     github.write_quality_summary("url", cov_report, quality_report, None, None)
 
-    patch_mock.assert_called_once_with(
-        "edit_url", json={"body": "covsummary\nquasummary"}, headers=expected_headers
+    assert_requested(
+        comment_request, "PATCH", "edit_url", json={"body": "covsummary\nquasummary"}
     )
 
 
-def test_write_quality_create_no_reports(expected_headers, mocker):
+def test_write_quality_create_no_reports(expected_headers, session_request, mocker):
     mocker.patch.object(github, "_get_comment_url", return_value=False)
 
-    post_mock = mocker.patch.object(github.requests, "post", side_effect=None)
-    patch_mock = mocker.patch.object(github.requests, "patch", side_effect=None)
-    delete_mock = mocker.patch.object(github.requests, "delete", side_effect=None)
-
     github.write_quality_summary("url", False, False, None, None)
 
-    assert post_mock.called is False
-    assert patch_mock.called is False
-    assert delete_mock.called is False
+    assert session_request.called is False
 
 
-def test_write_summary_deletes_report_previously_created(mocker, expected_headers):
+def test_write_summary_deletes_report_previously_created(
+    mocker, expected_headers, session_request
+):
     mocker.patch.object(github, "_get_comment_url", return_value="delete_url")
-    delete_mock = mocker.patch.object(github.requests, "delete", side_effect=None)
 
     github.write_quality_summary("url", False, False, None, None)
 
-    delete_mock.assert_called_once_with("delete_url", headers=expected_headers)
+    assert_requested(session_request, "DELETE", "delete_url")
+
+
+COMMENTS_URL = "https://api.github.com/repos/owner/repo/issues/10/comments"
+
+
+def test_get_summary_key():
+    assert github._get_summary_key(COMMENTS_URL, "quality") == "owner/repo#10:quality"
+
+
+def test_write_summary_indexes_created_comment(
+    expected_headers, comment_request, mocker
+):
+    mocker.patch.object(github, "_get_comment_url", return_value=False)
+
+    github._write_summary(COMMENTS_URL, "standard", {"body": "content"})
+
+    assert github.comment_index.get("owner/repo#10:standard") == "comment_url"
+
+
+def test_write_summary_edits_indexed_comment(expected_headers, comment_request, mocker):
+    comment_url_mock = mocker.patch.object(github, "_get_comment_url")
+    github.comment_index.set("owner/repo#10:standard", "indexed_url")
+
+    github._write_summary(COMMENTS_URL, "standard", {"body": "content"})
+
+    assert comment_url_mock.called is False
+    assert_requested(comment_request, "PATCH", "indexed_url", json={"body": "content"})
+
+
+def test_write_summary_indexed_comment_gone(expected_headers, mocker):
+    mocker.patch.object(github, "_get_comment_url", return_value=False)
+    request = mocker.patch.object(
+        github.get_client().session,
+        "request",
+        side_effect=[
+            MagicMock(status_code=404),
+            MagicMock(ok=True, **{"json.return_value": {"url": "new_url"}}),
+        ],
+    )
+    github.comment_index.set("owner/repo#10:standard", "indexed_url")
+
+    github._write_summary(COMMENTS_URL, "standard", {"body": "content"})
+
+    assert request.call_args_list[1][0] == ("POST", COMMENTS_URL)
+    assert github.comment_index.get("owner/repo#10:standard") == "new_url"
+
+
+def test_delete_summary_removes_indexed_comment(
+    expected_headers, session_request, mocker
+):
+    comment_url_mock = mocker.patch.object(github, "_get_comment_url")
+    github.comment_index.set("owner/repo#10:standard", "indexed_url")
+
+    github.delete_standard_summary(COMMENTS_URL)
+
+    assert comment_url_mock.called is False
+    assert_requested(session_request, "DELETE", "indexed_url")
+    assert github.comment_index.get("owner/repo#10:standard") is None
+
+
+def test_get_repo_id_is_cached(expected_headers, session_request):
+    session_request.return_value.json.return_value = {"id": 123}
+
+    assert github.get_repo_id("owner", "repo") == 123
+    assert github.get_repo_id("owner", "repo") == 123
+    assert session_request.call_count == 1
+
+
+def test_get_repo_id_remembered(expected_headers, session_request):
+    github.remember_repo_id("owner", "repo", 456)
+
+    assert github.get_repo_id("owner", "repo") == 456
+    assert session_request.called is False
+
+
+def test_publish_statuses_returns_outcome_per_check(mocker):
+    def _update_pr_status(url, state, context, *args):
+        return MagicMock(ok=context == "ok", text="error")
+
+    mocker.patch.object(github, "update_pr_status", side_effect=_update_pr_status)
+    checks = [
+        {"state": "success", "context": "ok", "description": "", "target_url": ""},
+        {"state": "success", "context": "bad", "description": "", "target_url": ""},
+    ]
+
+    outcomes = github.publish_statuses("url", checks)
+
+    assert [outcome.ok for outcome in outcomes] == [True, False]
+    assert isinstance(outcomes[1].error, github.GitHubException)
+
+
+def test_publish_statuses_skips_unchanged(session_request, expected_headers, mocker):
+    session_request.return_value = MagicMock(
+        ok=True, headers={}, **{"json.return_value": {"statuses": [
+            {"context": "same", "state": "success", "description": "ok",
+             "target_url": None},
+            {"context": "changed", "state": "pending", "description": "",
+             "target_url": ""},
+        ]}}
+    )
+    update_status_mock = mocker.patch.object(github, "update_pr_status")
+    checks = [
+        {"state": "success", "context": "same", "description": "ok", "target_url": ""},
+        {"state": "success", "context": "changed", "description": "", "target_url": ""},
+        {"state": "success", "context": "new", "description": "", "target_url": ""},
+    ]
+
+    outcomes = github.publish_statuses(
+        "https://api.github.com/repos/owner/repo/statuses/sha",
+        checks,
+        skip_unchanged=True,
+    )
+
+    assert session_request.call_args[0][1] == (
+        "https://api.github.com/repos/owner/repo/commits/sha/status"
+    )
+    assert [outcome.result is None for outcome in outcomes] == [True, False, False]
+    assert update_status_mock.call_count == 2
+
+
+def test_publish_statuses_sends_all_when_statuses_are_unavailable(
+    session_request, expected_headers, mocker
+):
+    session_request.return_value = MagicMock(ok=False, headers={}, text="error")
+    update_status_mock = mocker.patch.object(github, "update_pr_status")
+    checks = [
+        {"state": "success", "context": "ctx", "description": "", "target_url": ""}
+    ]
+
+    github.publish_statuses(
+        "https://api.github.com/repos/o/r/statuses/sha", checks, skip_unchanged=True
+    )
+
+    update_status_mock.assert_called_once()
+
+
+def _graphql_page(nodes, cursor=None):
+    return {"pullRequests": {
+        "pageInfo": {"hasNextPage": cursor is not None, "endCursor": cursor},
+        "nodes": [{"number": number, "headRefOid": sha} for number, sha in nodes],
+    }}
+
+
+def test_get_open_pr_heads_paginates_per_repo(mocker):
+    responses = [
+        {"data": {"r0": _graphql_page([(1, "a")], cursor="next"), "r1": None}},
+        {"data": {"r0": _graphql_page([(2, "b")])}},
+    ]
+    post_mock = mocker.patch.object(
+        github.get_client(), "post",
+        side_effect=[
+            MagicMock(ok=True, **{"json.return_value": data}) for data in responses
+        ],
+    )
+
+    prs, failed_repos = github.get_open_pr_heads(["owner/repo", "owner/gone"])
+
+    assert [pr["sha"] for pr in prs] == ["a", "b"]
+    assert prs[0]["statuses_url"] == (
+        "https://api.github.com/repos/owner/repo/statuses/a"
+    )
+    assert failed_repos == ["owner/gone"]
+
+    first_variables = post_mock.call_args_list[0][1]["json"]["variables"]
+    assert first_variables["r1_name"] == "gone"
+    second_variables = post_mock.call_args_list[1][1]["json"]["variables"]
+    assert second_variables == {
+        "r0_owner": "owner", "r0_name": "repo", "r0_cursor": "next"
+    }
+
+
+@pytest.mark.parametrize("payload", [
+    {"errors": [{"message": "Bad credentials"}]},
+    {"data": None, "errors": [{"message": "Parse error"}]},
+])
+def test_get_open_pr_heads_raises_when_query_fails(payload, mocker):
+    mocker.patch.object(
+        github.get_client(), "post",
+        return_value=MagicMock(ok=True, text="error", **{"json.return_value": payload}),
+    )
+
+    with pytest.raises(github.GitHubException):
+        github.get_open_pr_heads(["owner/repo"])
+
+
+def test_get_open_pr_heads_batches_repos(mocker):
+    mocker.patch.object(github, "GRAPHQL_REPOS_PER_QUERY", 2)
+    query_mock = mocker.patch.object(github, "_query_open_prs", return_value={})
+
+    _, failed_repos = github.get_open_pr_heads(["o/a", "o/b", "o/c"])
+
+    assert query_mock.call_count == 2
+    assert failed_repos == ["o/a", "o/b", "o/c"]
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from src import instrumentation
+
+
+@pytest.fixture(autouse=True)
+def warm_container(mocker):
+    mocker.patch.object(instrumentation, "_cold_start", False)
+    mocker.patch.object(instrumentation, "_spans", {})
+
+
+def _read_metrics_line(capsys):
+    lines = capsys.readouterr().out.strip().splitlines()
+    return json.loads(lines[-1])
+
+
+def test_instrumented_handler_prints_spans(capsys):
+    @instrumentation.instrumented("handler")
+    def handler(event, context):
+        instrumentation.record("github", 0.5, 100)
+        instrumentation.record("github", 0.25, 50)
+        with instrumentation.span("parse"):
+            pass
+        return "ok"
+
+    assert handler({}, None) == "ok"
+    line = _read_metrics_line(capsys)
+
+    assert line["Handler"] == "handler"
+    assert line["ColdStart"] == 0
+    assert line["github.time"] == 750
+    assert line["github.count"] == 2
+    assert line["github.bytes"] == 150
+    assert line["parse.count"] == 1
+    assert "parse.bytes" not in line
+
+    metrics = line["_aws"]["CloudWatchMetrics"][0]
+    assert metrics["Dimensions"] == [["Handler"]]
+    assert {"Name": "github.bytes", "Unit": "Bytes"} in metrics["Metrics"]
+
+
+def test_cold_start_is_only_flagged_once(mocker, capsys):
+    mocker.patch.object(instrumentation, "_cold_start", True)
+    handler = instrumentation.instrumented("handler")(lambda event, context: None)
+
+    handler({}, None)
+    first = _read_metrics_line(capsys)
+    handler({}, None)
+    second = _read_metrics_line(capsys)
+
+    assert first["ColdStart"] == 1
+    assert second["ColdStart"] == 0
+
+
+def test_spans_are_printed_when_handler_raises(capsys):
+    @instrumentation.instrumented("handler")
+    @instrumentation.timed("work")
+    def handler(event, context):
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        handler({}, None)
+
+    assert _read_metrics_line(capsys)["work.count"] == 1
@@ -0,0 +1,43 @@
+from src import quality_summary
+from src.qualitytools.merge import merge_quality_reports
+
+
+def _parse(content):
+    report, _ = quality_summary._parse_quality_content(content)
+    return report
+
+
+def test_merge_quality_reports(flake8_qualitydiff_content, eslint_qualitydiff_content):
+    flake8 = _parse(flake8_qualitydiff_content)
+    eslint = _parse(eslint_qualitydiff_content)
+
+    report = merge_quality_reports([("flake8", flake8), ("eslint", eslint)])
+
+    assert report["target_branch"] == "origin/dev"
+    assert report["total"] == "735"
+    assert report["violations"] == "8"
+    assert report["quality"] == "98%"
+    assert len(report["issues"]) == 10
+    assert report["issues"][0]["tool"] == "flake8"
+    assert report["issues"][-1]["tool"] == "eslint"
+    assert len(report["files"]) == 17
+
+
+def test_merge_keeps_worst_value_per_file(flake8_qualitydiff_content):
+    flake8 = _parse(flake8_qualitydiff_content)
+    mypy = _parse(flake8_qualitydiff_content.replace("(80.0%)", "(50.0%)"))
+
+    report = merge_quality_reports([("flake8", flake8), ("mypy", mypy)])
+
+    assert len(report["files"]) == 13
+    assert report["files"][0]["value"] == "50.0%"
+
+
+def test_merge_single_report_is_untouched(flake8_qualitydiff_content):
+    flake8 = _parse(flake8_qualitydiff_content)
+
+    assert merge_quality_reports([("flake8", flake8), ("eslint", False)]) is flake8
+
+
+def test_merge_empty_reports():
+    assert merge_quality_reports([("flake8", False), ("eslint", False)]) is False
@@ -5,6 +5,38 @@ from unittest.mock import MagicMock
 import pytest
 
 from src import error_handler, pr_standard
+from src.cache import LocalCache
+
+
+@pytest.fixture(autouse=True)
+def empty_caches(mocker):
+    mocker.patch.object(pr_standard, "validated_commits", LocalCache())
+
+
+@pytest.fixture
+def pushed_pull_request():
+    """
+    PR that just got commit "after" pushed on top of "before"
+    """
+    pr_standard.validated_commits.set("owner/repo#1", {
+        "head": "before",
+        "commits": [
+            {"sha": "first", "message": "FY-1234 Do work", "standard": True},
+            {"sha": "before", "message": "wip", "standard": False},
+        ],
+    })
+    return {
+        "number": 1,
+        "commits": 3,
+        "commits_url": "commits_url",
+        "head": {"sha": "after"},
+        "base": {
+            "repo": {
+                "full_name": "owner/repo",
+                "compare_url": "compare/{base}...{head}",
+            }
+        },
+    }
 
 
 @pytest.fixture
@@ -182,9 +214,115 @@ def test_lambda_handler_handles_exception(
         "update_pr_status",
         side_effect=pr_standard.github.GitHubException("www.site.com", "text"),
     )
+    summary_mock = mocker.patch.object(pr_standard.github, "delete_standard_summary")
 
     response = pr_standard.handler(event, "")
 
     assert response["statusCode"] == error_handler.GH_FAIL_RESPONSE["statusCode"]
     assert response["headers"] == error_handler.GH_FAIL_RESPONSE["headers"]
     assert "body" in response
+    summary_mock.assert_not_called()
+
+
+def test_validate_only_pushed_commits(pushed_pull_request, mocker):
+    get_commits_mock = mocker.patch.object(pr_standard.github, "get_commits")
+    compare_mock = mocker.patch.object(
+        pr_standard.github,
+        "get_compared_commits",
+        return_value=[{"sha": "after", "commit": {"message": "NO-TICKET Fix"}}],
+    )
+
+    result = pr_standard._validate_commits(pushed_pull_request, "before")
+
+    check_commits(result, True, False, True)
+    rules = [commit["rule"] for commit in result[0]]
+    assert rules == [r"^\w+\-\d+", None, r"^NO-TICKET"]
+    compare_mock.assert_called_once_with("compare/{base}...{head}", "before", "after")
+    get_commits_mock.assert_not_called()
+    assert pr_standard.validated_commits.get("owner/repo#1")["head"] == "after"
+
+
+def test_validate_all_commits_after_force_push(
+    pushed_pull_request, valid_commits, mocker
+):
+    pushed_pull_request["commits"] = len(valid_commits)
+    get_commits_mock = mocker.patch.object(
+        pr_standard.github, "get_commits", return_value=valid_commits
+    )
+    mocker.patch.object(pr_standard.github, "get_compared_commits", return_value=None)
+
+    result = pr_standard._validate_commits(pushed_pull_request, "before")
+
+    check_commits(result, True, True, True, True, True)
+    get_commits_mock.assert_called_once_with("commits_url")
+
+
+@pytest.mark.parametrize("action, changes, expected", [
+    ("opened", None, True),
+    ("synchronize", None, True),
+    ("edited", {"title": {"from": "old"}}, True),
+    ("edited", {"base": {"ref": {"from": "dev"}}}, True),
+    ("edited", {"body": {"from": "old"}}, False),
+    ("closed", None, False),
+    ("labeled", None, False),
+    (None, None, True),
+])
+def test_should_evaluate(action, changes, expected):
+    ghevent = {"action": action, "changes": changes or {}}
+    assert pr_standard._should_evaluate(ghevent) is expected
+
+
+def test_lambda_handler_ignores_closed_pr(
+    event_creator, incoming_open_pr_payload, mocker
+):
+    payload = {**json.loads(incoming_open_pr_payload), "action": "closed"}
+    mocker.patch.object(pr_standard.security, "validate_secret", return_value=True)
+    validate_mock = mocker.patch.object(pr_standard, "_validate_pr")
+    publish_mock = mocker.patch.object(pr_standard.github, "publish_statuses")
+
+    response = pr_standard.handler(event_creator(json.dumps(payload)), None)
+
+    assert response == pr_standard.OK_RESPONSE
+    validate_mock.assert_not_called()
+    publish_mock.assert_not_called()
+
+
+def test_title_edit_reuses_cached_commits(pushed_pull_request, mocker):
+    get_commits_mock = mocker.patch.object(pr_standard.github, "get_commits")
+    pushed_pull_request.update(
+        {"title": "NO-TICKET Title", "head": {"sha": "before"}, "commits": 2}
+    )
+
+    report, result, reason = pr_standard._validate_pr(pushed_pull_request)
+
+    assert report["title"]["standard"] is True
+    assert [commit["sha"] for commit in report["commits"]] == ["first", "before"]
+    assert reason == pr_standard.COMMITS_FAILURE_REASON
+    get_commits_mock.assert_not_called()
+
+
+def test_base_edit_fetches_all_commits(
+    event_creator, incoming_open_pr_payload, valid_commits, mocker
+):
+    payload = json.loads(incoming_open_pr_payload)
+    pull_request = payload["pull_request"]
+    payload.update({"action": "edited", "changes": {"base": {"ref": {"from": "dev"}}}})
+    # Same head and commit count, only the base tells commits changed
+    pull_request["commits"] = 1
+    key = pr_standard._get_validation_key(pull_request)
+    cached = [{"sha": "old", "message": "Commit from previous base"}]
+    pr_standard.validated_commits.set(
+        key, {"head": pull_request["head"]["sha"], "commits": cached}
+    )
+    mocker.patch.object(pr_standard.security, "validate_secret", return_value=True)
+    get_commits_mock = mocker.patch.object(
+        pr_standard.github, "get_commits", return_value=valid_commits
+    )
+    mocker.patch.object(pr_standard.github, "publish_statuses", return_value=[])
+    mocker.patch.object(pr_standard.github, "delete_standard_summary")
+    mocker.patch.object(pr_standard.github, "write_standard_summary")
+
+    pr_standard.handler(event_creator(json.dumps(payload)), None)
+
+    get_commits_mock.assert_called_once_with(pull_request["commits_url"])
+    assert len(pr_standard.validated_commits.get(key)["commits"]) == len(valid_commits)
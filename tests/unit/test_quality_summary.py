@@ -1,17 +1,39 @@
 import json
-from unittest.mock import call
+from unittest.mock import MagicMock, call
+
+import pytest
 
 from src import quality_summary
+from src.cache import LocalCache
 from src.CircleCommitDTO import CircleCommitDTO
 
+STATUS = {
+    "commit_sha": "sha",
+    "owner": "guilatrova",
+    "project": "Github-Lambda-Status-Checks",
+    "build_num": "1",
+    "quality_tool": "flake8",
+    "coverage": "100%",
+    "quality": False,
+}
 
 
-def test_read_coverage_file(mocker, covdiff_content):
-    mocker.patch.object(
-        quality_summary.s3, "get_coverage_file", return_value=covdiff_content
-    )
+@pytest.fixture(autouse=True)
+def empty_caches(mocker):
+    mocker.patch.object(quality_summary, "summarized_commits", LocalCache())
+
+
+@pytest.fixture()
+def gh_event(event_creator, incoming_open_pr_payload, mocker):
+    mocker.patch.object(quality_summary.security, "validate_secret", return_value=True)
+    mocker.patch.object(quality_summary.github, "remember_repo_id")
+    payload = json.loads(incoming_open_pr_payload)
+    return payload, event_creator(incoming_open_pr_payload)
+
 
-    report = quality_summary._read_coverage_file("")
+
+def test_parse_coverage_file(covdiff_content):
+    report = quality_summary._parse_coverage_content(covdiff_content)
 
     assert len(report["files"]) == 5
     assert len(report["files"][0]) == 3
@@ -30,57 +52,54 @@ def test_read_coverage_file(mocker, covdiff_content):
     assert report["coverage"] == "15%"
 
 
-def test_read_coverage_file_single_line(mocker, covdiffsingle_content):
-    mocker.patch.object(
-        quality_summary.s3, "get_coverage_file", return_value=covdiffsingle_content
-    )
-
-    report = quality_summary._read_coverage_file("")
+def test_parse_coverage_file_single_line(covdiffsingle_content):
+    report = quality_summary._parse_coverage_content(covdiffsingle_content)
 
     assert report["total"] == "1"
     assert report["missing"] == "1"
 
 
-def test_read_coverage_empty_file(mocker, covdiff_empty_content):
-    mocker.patch.object(
-        quality_summary.s3, "get_coverage_file", return_value=covdiff_empty_content
-    )
-
-    report = quality_summary._read_coverage_file("")
+def test_parse_coverage_empty_file(covdiff_empty_content):
+    report = quality_summary._parse_coverage_content(covdiff_empty_content)
 
     assert report is False
 
 
-def test_update_github_status_failure(mocker):
-    update_status_mock = mocker.patch.object(quality_summary.github, "update_pr_status")
+def test_create_check_failure():
     report = {"key": "30%"}
 
-    quality_summary._update_github_status(report, "url", "key", 50, "link")
+    check = quality_summary._create_check(report, "key", 50, "link")
 
-    update_status_mock.assert_called_once_with(
-        "url", "failure", "FineTune Key", "Key diff is below expected (30% out of 50%)", "link"
-    )
+    assert check == {
+        "state": "failure",
+        "context": "FineTune Key",
+        "description": "Key diff is below expected (30% out of 50%)",
+        "target_url": "link",
+    }
 
 
-def test_update_github_status_success(mocker):
-    update_status_mock = mocker.patch.object(quality_summary.github, "update_pr_status")
+def test_create_check_success():
     report = {"key": "50%"}
 
-    quality_summary._update_github_status(report, "url", "key", 50, "link")
+    check = quality_summary._create_check(report, "key", 50, "link")
 
-    update_status_mock.assert_called_once_with(
-        "url", "success", "FineTune Key", "Key diff is good!", "link"
-    )
+    assert check == {
+        "state": "success",
+        "context": "FineTune Key",
+        "description": "Key diff is good!",
+        "target_url": "link",
+    }
 
 
-def test_update_github_status_no_report(mocker):
-    update_status_mock = mocker.patch.object(quality_summary.github, "update_pr_status")
+def test_create_check_no_report():
+    check = quality_summary._create_check(False, "coverage", 50, "link")
 
-    quality_summary._update_github_status(False, "url", "coverage", 50, "link")
-
-    update_status_mock.assert_called_once_with(
-        "url", "success", "FineTune Coverage", "No report provided for this commit", ""
-    )
+    assert check == {
+        "state": "success",
+        "context": "FineTune Coverage",
+        "description": "No report provided for this commit",
+        "target_url": "",
+    }
 
 
 def test_update_status_summary_all_successful_reports(mocker):
@@ -115,4 +134,175 @@ def test_update_status_summary_all_successful_reports(mocker):
     quality_call = call(
         status_url, "success", "FineTune Quality", "Quality diff is good!", qual_link
     )
-    update_status_mock.assert_has_calls([coverage_call, quality_call])
+    update_status_mock.assert_has_calls([coverage_call, quality_call], any_order=True)
+
+
+def test_gh_handler_remembers_repo_id(event_creator, incoming_open_pr_payload, mocker):
+    mocker.patch.object(quality_summary.security, "validate_secret", return_value=True)
+    mocker.patch.object(
+        quality_summary.dynamodb, "get_report_status", return_value=False
+    )
+    remember_mock = mocker.patch.object(quality_summary.github, "remember_repo_id")
+
+    response = quality_summary.gh_handler(event_creator(incoming_open_pr_payload), None)
+
+    remember_mock.assert_called_once_with(
+        "guilatrova", "Github-Lambda-Status-Checks", 160426730
+    )
+    assert response["statusCode"] == 200
+
+
+def test_update_github_pr_reports_failed_checks(mocker):
+    mocker.patch.object(quality_summary.github, "write_quality_summary")
+    update_status_mock = mocker.patch.object(
+        quality_summary.github,
+        "update_pr_status",
+        side_effect=lambda url, state, context, *args: MagicMock(
+            ok=context == "FineTune Coverage", text="error"
+        ),
+    )
+    footers = {"quality": "quality", "coverage": "coverage"}
+
+    with pytest.raises(quality_summary.github.GitHubException):
+        quality_summary._update_github_pr(
+            "summary_url", "status_url", False, False, footers, {}, "flake8"
+        )
+
+    assert update_status_mock.call_count == 2
+
+
+def test_load_reports(mocker, covdiff_content, flake8_qualitydiff_content):
+    mocker.patch.object(
+        quality_summary.s3, "stream_coverage_file", return_value=covdiff_content
+    )
+    mocker.patch.object(
+        quality_summary.s3,
+        "stream_quality_file",
+        return_value=flake8_qualitydiff_content,
+    )
+
+    cov_report, quality_report, tool, timings = quality_summary._load_reports("hash")
+
+    assert cov_report["coverage"] == "15%"
+    assert quality_report["quality"] == "99%"
+    assert tool == "flake8"
+    assert set(timings["coverage"]) == {"fetch", "parse"}
+    assert set(timings["quality"]) == {"fetch", "parse"}
+
+
+def test_load_reports_raises_fetch_errors(mocker, covdiff_content):
+    mocker.patch.object(
+        quality_summary.s3, "stream_coverage_file", return_value=covdiff_content
+    )
+    mocker.patch.object(
+        quality_summary.s3, "stream_quality_file", side_effect=ValueError("Boom")
+    )
+
+    with pytest.raises(ValueError):
+        quality_summary._load_reports("hash")
+
+
+def test_load_reports_many_tools(
+    mocker, covdiff_content, flake8_qualitydiff_content, eslint_qualitydiff_content
+):
+    contents = {
+        "flake8": flake8_qualitydiff_content,
+        "eslint": eslint_qualitydiff_content,
+    }
+    mocker.patch.object(
+        quality_summary.s3, "stream_coverage_file", return_value=covdiff_content
+    )
+    quality_mock = mocker.patch.object(
+        quality_summary.s3,
+        "stream_quality_file",
+        side_effect=lambda hash, tool: contents[tool],
+    )
+
+    _, quality_report, tool, timings = quality_summary._load_reports(
+        "hash", ["flake8", "eslint"]
+    )
+
+    assert quality_mock.call_count == 2
+    assert tool == "flake8,eslint"
+    assert quality_report["violations"] == "8"
+    assert set(timings) == {"coverage", "quality:flake8", "quality:eslint"}
+
+
+def test_footers_many_tools():
+    reference = CircleCommitDTO(
+        "owner", "project", "commit", "build", "flake8,mypy", "repo"
+    )
+
+    footers = quality_summary._get_footers(reference)
+
+    assert "[**flake8 quality report**]" in footers["quality"]
+    assert (
+        "[**mypy quality report**]"
+        "(https://build-repo-gh.circle-artifacts.com/0/quality-reports/mypy.html)"
+    ) in footers["quality"]
+
+
+def test_gh_handler_publishes_checks_only_when_summary_is_up_to_date(gh_event, mocker):
+    payload, event = gh_event
+    pull_request = payload["pull_request"]
+    quality_summary.summarized_commits.set(
+        pull_request["comments_url"], pull_request["head"]["sha"]
+    )
+    mocker.patch.object(
+        quality_summary.dynamodb, "get_report_status", return_value=STATUS
+    )
+    get_report_mock = mocker.patch.object(quality_summary.dynamodb, "get_report")
+    write_summary_mock = mocker.patch.object(
+        quality_summary.github, "write_quality_summary"
+    )
+    publish_mock = mocker.patch.object(
+        quality_summary.github, "publish_statuses", return_value=[]
+    )
+
+    quality_summary.gh_handler(event, None)
+
+    checks = publish_mock.call_args[0][1]
+    assert [check["state"] for check in checks] == ["success", "success"]
+    assert checks[1]["description"] == "No report provided for this commit"
+    get_report_mock.assert_not_called()
+    write_summary_mock.assert_not_called()
+
+
+def test_gh_handler_reads_full_report_for_new_summary(gh_event, mocker):
+    payload, event = gh_event
+    pull_request = payload["pull_request"]
+    report = {**STATUS, "cov_report": {"coverage": "100%"}, "quality_report": False}
+    mocker.patch.object(
+        quality_summary.dynamodb, "get_report_status", return_value=STATUS
+    )
+    mocker.patch.object(quality_summary.dynamodb, "get_report", return_value=report)
+    write_summary_mock = mocker.patch.object(
+        quality_summary.github, "write_quality_summary"
+    )
+    mocker.patch.object(quality_summary.github, "publish_statuses", return_value=[])
+
+    quality_summary.gh_handler(event, None)
+
+    assert write_summary_mock.call_args[0][1] == {"coverage": "100%"}
+    summarized = quality_summary.summarized_commits.get(pull_request["comments_url"])
+    assert summarized == pull_request["head"]["sha"]
+
+
+def test_load_reports_closes_streams(
+    mocker, covdiff_empty_content, flake8_qualitydiff_content
+):
+    lines = iter(covdiff_empty_content.splitlines())
+    coverage_stream = MagicMock(**{"__iter__.return_value": lines})
+    mocker.patch.object(
+        quality_summary.s3, "stream_coverage_file", return_value=coverage_stream
+    )
+    mocker.patch.object(
+        quality_summary.s3,
+        "stream_quality_file",
+        return_value=flake8_qualitydiff_content,
+    )
+
+    cov_report, *_ = quality_summary._load_reports("hash")
+
+    assert cov_report is False
+    coverage_stream.close.assert_called_once()
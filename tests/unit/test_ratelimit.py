@@ -0,0 +1,83 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.thirdparties import github
+from src.thirdparties.ratelimit import RateLimiter
+
+BUDGET_HEADERS = {"X-RateLimit-Limit": "5000", "X-RateLimit-Reset": "1000"}
+
+
+@pytest.fixture()
+def no_sleep(mocker):
+    return mocker.patch("src.thirdparties.ratelimit.time.sleep")
+
+
+def _response(status_code, **headers):
+    return MagicMock(
+        status_code=status_code, ok=status_code < 400, headers=headers, content=b""
+    )
+
+
+def test_concurrency_shrinks_with_budget():
+    limiter = RateLimiter(10, low_budget=100)
+    assert limiter.get_concurrency() == 10
+
+    limiter.update({**BUDGET_HEADERS, "X-RateLimit-Remaining": "50"})
+    assert limiter.get_concurrency() == 5
+
+    limiter.update({**BUDGET_HEADERS, "X-RateLimit-Remaining": "0"})
+    assert limiter.get_concurrency() == 1
+    assert limiter.get_concurrency("graphql") == 10
+
+
+def test_retry_delay(mocker):
+    mocker.patch("src.thirdparties.ratelimit.time.time", return_value=990)
+    limiter = RateLimiter(10)
+
+    assert limiter.get_retry_delay(_response(403, **{"Retry-After": "3"})) == 3
+    exhausted = _response(403, **{**BUDGET_HEADERS, "X-RateLimit-Remaining": "0"})
+    assert limiter.get_retry_delay(exhausted) == 10
+    assert limiter.get_retry_delay(_response(403)) is None
+    assert limiter.get_retry_delay(_response(500, **{"Retry-After": "3"})) is None
+
+
+def test_exhausted_budget_waits_for_reset(mocker, no_sleep):
+    mocker.patch("src.thirdparties.ratelimit.time.time", return_value=998)
+    limiter = RateLimiter(10)
+    limiter.update({**BUDGET_HEADERS, "X-RateLimit-Remaining": "0"})
+
+    limiter.acquire()
+    limiter.release()
+
+    no_sleep.assert_called_once_with(2)
+    assert limiter.get_metrics()["waits"] == 1
+
+
+def test_client_retries_after_secondary_rate_limit(mocker, no_sleep):
+    mocker.patch.dict("os.environ", {"GITHUB_TOKEN": "123456"})
+    client = github.GitHubClient()
+    request_mock = mocker.patch.object(
+        client.session, "request",
+        side_effect=[_response(403, **{"Retry-After": "1"}), _response(201)],
+    )
+
+    response = client.post("url", json={})
+
+    assert response.status_code == 201
+    assert request_mock.call_count == 2
+    no_sleep.assert_called_once_with(1)
+
+
+def test_client_gives_up_when_wait_is_too_long(mocker, no_sleep):
+    mocker.patch.dict("os.environ", {"GITHUB_TOKEN": "123456"})
+    client = github.GitHubClient()
+    request_mock = mocker.patch.object(
+        client.session, "request", return_value=_response(429, **{"Retry-After": "60"})
+    )
+
+    response = client.post("url", json={})
+
+    assert response.status_code == 429
+    assert request_mock.call_count == 1
+    no_sleep.assert_not_called()
@@ -0,0 +1,53 @@
+import sys
+
+import pytest
+
+from src.qualitytools import factory, registry
+from src.qualitytools.base import BaseQualityAdapter
+
+
+@pytest.fixture(autouse=True)
+def isolated_registry(mocker):
+    mocker.patch.dict(registry._adapters)
+    mocker.patch.dict(registry._adapter_modules)
+
+
+def test_registered_adapter_is_dispatched(flake8_qualitydiff_content):
+    @registry.register_adapter("custom")
+    class CustomAdapter(BaseQualityAdapter):
+        pass
+
+    content = flake8_qualitydiff_content.replace("flake8", "custom")
+    adapter, tool = factory.create_quality_adapter(content)
+
+    assert tool == "custom"
+    assert isinstance(adapter, CustomAdapter)
+
+
+def test_adapter_module_is_imported_lazily(mocker):
+    registry._adapters.pop("eslint", None)
+    mocker.patch.dict(sys.modules)
+    sys.modules.pop(f"{registry.__package__}.eslint", None)
+    import_mock = mocker.spy(registry.importlib, "import_module")
+
+    adapter = registry.get_adapter("eslint")
+
+    import_mock.assert_called_once_with(".eslint", registry.__package__)
+    assert adapter.__name__ == "EslintAdapter"
+
+
+def test_loaded_adapter_is_not_imported_again(mocker):
+    registry.get_adapter("flake8")
+    import_mock = mocker.spy(registry.importlib, "import_module")
+
+    registry.get_adapter("flake8")
+
+    assert import_mock.called is False
+
+
+def test_unknown_adapter(flake8_qualitydiff_content):
+    content = flake8_qualitydiff_content.replace("flake8", "unknown")
+
+    assert registry.get_adapter("unknown") is None
+    with pytest.raises(Exception):
+        factory.create_quality_adapter(content)
@@ -0,0 +1,36 @@
+import json
+
+from src import quality_summary
+from src.aws import report_codec
+from src.qualitytools.merge import merge_quality_reports
+
+
+def test_round_trip(
+    covdiff_content, flake8_qualitydiff_content, eslint_qualitydiff_content
+):
+    flake8, _ = quality_summary._parse_quality_content(flake8_qualitydiff_content)
+    eslint, _ = quality_summary._parse_quality_content(eslint_qualitydiff_content)
+    reports = {
+        "cov_report": quality_summary._parse_coverage_content(covdiff_content),
+        "quality_report": merge_quality_reports(
+            [("flake8", flake8), ("eslint", eslint)]
+        ),
+    }
+
+    decoded = report_codec.decode(report_codec.encode(reports))
+
+    assert decoded == reports
+
+
+def test_round_trip_empty_reports():
+    reports = {"cov_report": False, "quality_report": False}
+
+    assert report_codec.decode(report_codec.encode(reports)) == reports
+
+
+def test_paths_are_interned(flake8_qualitydiff_content):
+    report, _ = quality_summary._parse_quality_content(flake8_qualitydiff_content)
+
+    encoded = report_codec.encode({"quality_report": report})
+
+    assert len(encoded) < len(json.dumps(report)) / 2
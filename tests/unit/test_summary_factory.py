@@ -31,12 +31,8 @@ def test_create_standard_summary(mocker):
     assert "#DOCS#" not in result
 
 
-def test_create_coverage_summary(mocker, covdiff_content):
-    mocker.patch.object(
-        quality_summary.s3, "get_coverage_file", return_value=covdiff_content
-    )
-
-    report = quality_summary._read_coverage_file("")
+def test_create_coverage_summary(covdiff_content):
+    report = quality_summary._parse_coverage_content(covdiff_content)
 
     result = summary_factory.create_coverage_summary(report, "footer_message")
 
@@ -56,12 +52,8 @@ def test_create_coverage_summary(mocker, covdiff_content):
     assert "\nexample/schemas/subjects.py        25.0% " in result
 
 
-def test_create_quality_summary(mocker, flake8_qualitydiff_content):
-    mocker.patch.object(
-        quality_summary.s3, "get_quality_file", return_value=flake8_qualitydiff_content
-    )
-
-    report, tool = quality_summary._read_quality_file("")
+def test_create_quality_summary(flake8_qualitydiff_content):
+    report, tool = quality_summary._parse_quality_content(flake8_qualitydiff_content)
 
     result = summary_factory.create_quality_summary(report, "footer_message")
 